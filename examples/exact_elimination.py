@@ -0,0 +1,46 @@
+"""
+Compares the gaussian elimination of integer matrices in floats and in
+exact fractions.
+
+`matstep.simplifiers.MatrixSimplifier(exact=True)` and
+`matstep.matrices.RowReducer(..., exact=True)` convert the matrix to
+`fractions.Fraction` entries once before the first row operation. The
+float elimination is faster, but its rounding errors may break the zero
+and one checks of the pivot search, e.g. the rank 2 matrix below is
+reduced to the identity in floats.
+"""
+
+import timeit
+
+import numpy as np
+
+from matstep.matrices import RowReducer
+from matstep.simplifiers import MatrixSimplifier
+
+
+A = np.array([[-9, -11, -5], [-6, -2, -8], [-4, 4, -10]])
+print('rank 2 matrix:', A.tolist())
+for exact in (False, True):
+    rref = RowReducer(A, exact=exact).reduce()
+    print('  %-5s rref: %s' % ('exact' if exact else 'float', [[str(el) for el in row] for row in rref]))
+print()
+
+rng = np.random.default_rng(0)
+print('%4s  %-28s  %s' % ('n', 'RowReducer float / exact', 'MatrixSimplifier float / exact'))
+for n in (6, 12, 24):
+    matrix = rng.integers(-9, 10, (n, n + 1))
+    times = []
+    for exact in (False, True):
+        number = 20
+        times.append(timeit.timeit(lambda: RowReducer(matrix, exact=exact).reduce(), number=number) / number)
+    for exact in (False, True):
+        if n > 12:
+            # every step of the simplifier copies the whole matrix
+            times.append(None)
+            continue
+        simplifier = MatrixSimplifier(exact=exact)
+        number = 3
+        times.append(timeit.timeit(lambda: simplifier.final_gaussian_step(matrix), number=number) / number)
+
+    cells = ['-' if t is None else '%.1fms' % (t * 1000) for t in times]
+    print('%4d  %-28s  %s' % (n, ' / '.join(cells[:2]), ' / '.join(cells[2:])))
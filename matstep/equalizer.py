@@ -1,4 +1,8 @@
+import numbers
+
+import numpy as np
 import pymbolic
+from pymbolic.primitives import Expression, Variable, FunctionSymbol
 
 
 class EqualizerMapper(pymbolic.mapper.Mapper):
@@ -10,7 +14,7 @@ class EqualizerMapper(pymbolic.mapper.Mapper):
     """
 
     def map_constant(self, expr, other, *args, **kwargs):
-        return expr == other
+        return not isinstance(other, np.ndarray) and expr == other
 
     def map_variable(self, expr, other, *args, **kwargs):
         return expr.name == other.name
@@ -54,7 +58,8 @@ class EqualizerMapper(pymbolic.mapper.Mapper):
 
     def _map_quotient_base(self, expr, other, *args, **kwargs):
         return type(expr) == type(other) \
-                and self.rec(expr.numerator, other.numerator, *args, **kwargs)
+                and self.rec(expr.numerator, other.numerator, *args, **kwargs) \
+                and self.rec(expr.denominator, other.denominator, *args, **kwargs)
 
     def map_quotient(self, expr, other, *args, **kwargs):
         return self._map_quotient_base(expr, other, *args, **kwargs)
@@ -118,14 +123,13 @@ class EqualizerMapper(pymbolic.mapper.Mapper):
         return self._map_multichild_expr(expr, other, *args, **kwargs)
 
     def map_list(self, expr, other, *args, **kwargs):
-        return all(self.rec(el1, el2) for el1, el2 in zip(expr, other))
+        return isinstance(other, (list, tuple)) and len(expr) == len(other) \
+                and all(self.rec(el1, el2) for el1, el2 in zip(expr, other))
 
-    def map_tuple(self, expr, other, *args, **kwargs):
-        return all(self.rec(el1, el2) for el1, el2 in zip(expr, other))
+    map_tuple = map_list
 
     def map_numpy_array(self, expr, other, *args, **kwargs):
-        import numpy
-        return numpy.array_equal(expr, other)
+        return isinstance(other, np.ndarray) and np.array_equal(expr, other)
 
     def map_multivector(self, expr, other, *args, **kwargs):
         return type(expr) == type(other) \
@@ -176,6 +180,16 @@ class EqualizerMapper(pymbolic.mapper.Mapper):
         except ValueError:
             return expr == other
 
+    def handle_unsupported_expression(self, expr, other, *args, **kwargs):
+        if isinstance(expr, FunctionSymbol):
+            return self.map_function_symbol(expr, other, *args, **kwargs)
+
+        return type(expr) == type(other) \
+                and self.rec(expr.__getinitargs__(), other.__getinitargs__(), *args, **kwargs)
+
+    def rec(self, expr, other, *args, **kwargs):
+        return expr is other or super(EqualizerMapper, self).__call__(expr, other, *args, **kwargs)
+
     def __call__(self, expr, other, *args, **kwargs):
         return super(EqualizerMapper, self).__call__(expr, other, *args, **kwargs)
 
@@ -184,4 +198,213 @@ _eq = EqualizerMapper()
 
 
 def equals(expr1, expr2):
-    return _eq(expr1, expr2)
+    """
+    Returns whether the two expression trees are equal.
+
+    Identical objects are equal right away, and trees whose fingerprints differ are
+    unequal right away. The trees are only walked node by node when their fingerprints
+    match, or when either of them can not be fingerprinted. The walk follows the rules
+    of `EqualizerMapper` but keeps the pairs of nodes left to compare on an explicit
+    stack, so that arbitrarily deep trees can be compared.
+    """
+
+    if expr1 is expr2:
+        return True
+
+    fp1 = fingerprint(expr1)
+    if fp1 is not None:
+        fp2 = fingerprint(expr2)
+        if fp2 is not None and fp1 != fp2:
+            return False
+
+    stack = [(expr1, expr2)]
+    while stack:
+        el1, el2 = stack.pop()
+        if el1 is el2:
+            continue
+
+        pairs = _operand_pairs(el1, el2)
+        if pairs is None:
+            return False
+        stack.extend(reversed(pairs))
+
+    return True
+
+
+def same_types(expr1, expr2):
+    """
+    Returns whether the two expression trees, which `equals` finds equal, also hold
+    numbers of the same types and matrices of the same dtypes, e.g. `Sum((1, 2))` and
+    `Sum((1.0, 2))` are equal but do not simplify to the same number.
+    """
+
+    stack = [(expr1, expr2)]
+    while stack:
+        el1, el2 = stack.pop()
+        if el1 is el2:
+            continue
+        if type(el1) is not type(el2):
+            return False
+
+        if isinstance(el1, Expression):
+            stack.extend(zip(el1.__getinitargs__(), el2.__getinitargs__()))
+        elif isinstance(el1, (list, tuple)):
+            stack.extend(zip(el1, el2))
+        elif isinstance(el1, dict):
+            stack.extend((el1[k], el2[k]) for k in el1)
+        elif isinstance(el1, np.ndarray) or hasattr(el1, '__array__'):
+            # e.g. a copy-on-write matrix of rows
+            el1, el2 = np.asarray(el1), np.asarray(el2)
+            if el1.dtype != el2.dtype:
+                return False
+            if el1.dtype == object:
+                stack.extend(zip(el1.flat, el2.flat))
+
+    return True
+
+
+def _operand_pairs(expr1, expr2):
+    """
+    Compares the two nodes without their operands and returns the pairs of operands
+    that remain to be compared, or `None` if the nodes are not equal.
+    """
+
+    if isinstance(expr1, Expression):
+        fp1 = getattr(expr1, '_matstep_fingerprint', None)
+        fp2 = getattr(expr2, '_matstep_fingerprint', None)
+        if fp1 is not None and fp2 is not None and fp1 != fp2:
+            return None
+
+        if isinstance(expr1, Variable):
+            equal = expr1.name == getattr(expr2, 'name', None)
+        elif isinstance(expr1, FunctionSymbol):
+            equal = expr1.__class__.__name__ == expr2.__class__.__name__
+        elif expr1.mapper_method in _UNFINGERPRINTED:
+            equal = _eq(expr1, expr2)
+        elif type(expr1) == type(expr2):
+            return [*zip(expr1.__getinitargs__(), expr2.__getinitargs__())]
+        else:
+            equal = False
+    elif isinstance(expr1, (list, tuple)):
+        if isinstance(expr2, (list, tuple)) and len(expr1) == len(expr2):
+            return [*zip(expr1, expr2)]
+        equal = False
+    elif isinstance(expr1, dict):
+        if isinstance(expr2, dict) and expr1.keys() == expr2.keys():
+            return [(expr1[k], expr2[k]) for k in expr1]
+        equal = False
+    elif isinstance(expr1, np.ndarray):
+        equal = isinstance(expr2, np.ndarray) and np.array_equal(expr1, expr2)
+    else:
+        equal = not isinstance(expr2, np.ndarray) and expr1 == expr2
+
+    return [] if equal else None
+
+
+def fingerprint(expr):
+    """
+    Returns a structural hash of `expr` that is the same for any two expressions that
+    `equals` finds equal, or `None` if `expr` holds an object that can not be hashed
+    consistently with `equals`, e.g. an unhashable foreign object.
+
+    The fingerprint of a `pymbolic.primitives.Expression` node is cached on the node,
+    unless its subtree holds a `numpy.ndarray`, which may be mutated in place. The
+    tree is walked with an explicit stack, so that arbitrarily deep trees can be
+    fingerprinted.
+    """
+
+    # maps the id of each visited node to the node, which keeps the id from being
+    # reused, its fingerprint and whether the fingerprint may be cached
+    visited = {}
+    stack = [(expr, None)]
+
+    while stack:
+        node, operands = stack.pop()
+
+        if operands is None:
+            if id(node) in visited:
+                continue
+
+            leaf = _leaf_fingerprint(node)
+            if leaf is not None:
+                visited[id(node)] = (node, *leaf)
+                continue
+
+            operands = (node.__getinitargs__() if isinstance(node, Expression)
+                        else [*node.flat] if isinstance(node, np.ndarray)
+                        else node)
+            stack.append((node, operands))
+            stack.extend((op, None) for op in operands if id(op) not in visited)
+            continue
+
+        fps = []
+        cacheable = True
+        for op in operands:
+            _, fp, op_cacheable = visited[id(op)]
+            if fp is None:
+                fps = None
+                break
+            fps.append(fp)
+            cacheable = cacheable and op_cacheable
+
+        fp = None if fps is None else hash(('sequence', *fps))
+        if isinstance(node, Expression):
+            fp = None if fp is None else hash((type(node).__name__, fp))
+            if cacheable:
+                node._matstep_fingerprint = fp
+        elif isinstance(node, np.ndarray):
+            fp = None if fp is None else hash(('ndarray', node.shape, fp))
+            cacheable = False
+
+        visited[id(node)] = node, fp, cacheable
+
+    return visited[id(expr)][1]
+
+
+# mapper methods of `EqualizerMapper` that do not compare all of the init args
+_UNFINGERPRINTED = {'map_polynomial', 'map_multivector', 'map_derivative'}
+
+
+def _leaf_fingerprint(expr):
+    """
+    Returns the fingerprint of `expr` and whether it may be cached if it does not
+    depend on the fingerprints of operands, otherwise `None`.
+    """
+
+    if isinstance(expr, Expression):
+        try:
+            return expr._matstep_fingerprint, True
+        except AttributeError:
+            pass
+
+        if isinstance(expr, Variable):
+            fp = hash(('variable', expr.name))
+        elif isinstance(expr, FunctionSymbol):
+            fp = hash(('function', expr.__class__.__name__))
+        elif expr.mapper_method in _UNFINGERPRINTED:
+            fp = None
+        else:
+            return None
+
+        expr._matstep_fingerprint = fp
+        return fp, True
+
+    if isinstance(expr, (numbers.Number, str)):
+        return hash(expr), True
+    if isinstance(expr, (list, tuple)):
+        return None
+    if isinstance(expr, np.ndarray):
+        if expr.dtype == object and not all(isinstance(el, numbers.Number) for el in expr.flat):
+            return None
+        if expr.dtype.kind in 'biufcO':
+            # numerically equal entries of any dtype hash alike once cast to one dtype,
+            # adding zero turns negative zeros into positive ones
+            try:
+                values = np.asarray(expr, dtype=np.complex128) + 0
+            except (OverflowError, TypeError):
+                # e.g. integers or fractions too large for a complex number
+                return None, False
+            return hash(('ndarray', expr.shape, hash(values.tobytes()))), False
+        return None, False
+
+    return None, True
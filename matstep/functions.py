@@ -22,6 +22,7 @@ class Function(pymbolic.primitives.FunctionSymbol):
     """
 
     mapper_method = 'map_matstep_function'
+    init_arg_names = ()
 
     def make_stringifier(self, originating_stringifier=None):
         return FunctionStringifyMapper(originating_stringifier)
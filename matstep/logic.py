@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 import pandas as pd
 import pymbolic
@@ -32,33 +34,170 @@ class LogicalExpression(pymbolic.primitives.Expression):
         the column's component expression for each combination of the parameters in `expr`.
         """
 
-        def contextualize(props, vals):
-            return dict(zip([p.name for p in props], vals))
+        props, exprs = self._components()
+        evaluate = LogicalCompiler()(exprs)
+        return self._tabulate_rows(props, exprs, evaluate, combination(len(props), dtype=bool))
+
+    def tabulate_chunks(self, chunk_size=2**16):
+        """
+        Yields the truth table of `tabulate` as consecutive `pandas.DataFrame` chunks of
+        at most `chunk_size` rows each. Only one chunk is held in memory at a time, and
+        the chunks are indexed by their row numbers in the full table so that
+        concatenating them gives the same `pandas.DataFrame` as `tabulate`.
+        """
 
-        def filter_exprs(split_expr):
-            return [*reversed([*filter(lambda it: not isinstance(it, Proposition), split_expr)])]
+        props, exprs = self._components()
+        evaluate = LogicalCompiler()(exprs)
+        start = 0
+
+        for comb in combination_chunks(len(props), chunk_size, dtype=bool):
+            yield self._tabulate_rows(props, exprs, evaluate, comb, start)
+            start += len(comb)
+
+    def write_table(self, path, chunk_size=2**16, fmt=None):
+        """
+        Writes the truth table of `tabulate` to the file at `path` one chunk at a time,
+        so that tables too large to fit in memory can still be produced.
 
-        def filter_props(split_expr):
-            return sorted([*set(filter(lambda it: isinstance(it, Proposition), split_expr))])
+        :param path: the path of the output file
+
+        :param chunk_size: the maximum number of rows evaluated at a time
+
+        :param fmt: one of 'csv', 'npy' or 'parquet'; inferred from the extension of
+        `path` if not given. A '.npy' file is filled through a memory-mapped array of
+        0 and 1 bytes and has no headers. Writing '.parquet' requires `pyarrow`.
+
+        :raise ValueError: if the format is not supported
+        """
+
+        if fmt is None:
+            fmt = os.path.splitext(str(path))[1].lstrip('.')
+        fmt = fmt.lower()
+        props, exprs = self._components()
+        evaluate = LogicalCompiler()(exprs)
+        chunks = combination_chunks(len(props), chunk_size, dtype=bool)
+
+        if fmt == 'csv':
+            for i, comb in enumerate(chunks):
+                self._tabulate_rows(props, exprs, evaluate, comb)\
+                    .to_csv(path, mode='a' if i else 'w', header=not i, index=False)
+        elif fmt == 'npy':
+            table = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8,
+                                              shape=(2**len(props), len(props) + len(exprs)))
+            start = 0
+            for comb in chunks:
+                table[start:start + len(comb)] = self._evaluate_rows(props, evaluate, comb)
+                start += len(comb)
+            table.flush()
+        elif fmt == 'parquet':
+            import pyarrow
+            import pyarrow.parquet
+
+            writer = None
+            try:
+                for comb in chunks:
+                    rows = self._tabulate_rows(props, exprs, evaluate, comb)
+                    batch = pyarrow.Table.from_pandas(rows.rename(columns=str), preserve_index=False)
+                    if writer is None:
+                        writer = pyarrow.parquet.ParquetWriter(path, batch.schema)
+                    writer.write_table(batch)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            raise ValueError('unsupported table format %s' % repr(fmt))
+
+    def _components(self):
+        """
+        Returns the sorted propositions of this expression and its other distinct component
+        expressions ordered so that every expression comes after its operands.
+        """
 
         split_expr = LogicalSplitter()(self)
-        exprs = filter_exprs(split_expr)
-        props = filter_props(split_expr)
-        comb = combination(len(props))
-        evaluator = LogicalEvaluator()
-        truths = []
+        exprs = [*filter(lambda it: not isinstance(it, Proposition), split_expr)]
+        props = sorted([*set(filter(lambda it: isinstance(it, Proposition), split_expr))])
+
+        return props, exprs
+
+    @staticmethod
+    def _evaluate_rows(props, evaluate, comb):
+        # each column of comb is the truth value of one proposition over every row,
+        # so every component expression is evaluated over the whole block at once
+        return np.column_stack([comb, *evaluate({p.name: comb[:, i] for i, p in enumerate(props)})])
+
+    @classmethod
+    def _tabulate_rows(cls, props, exprs, evaluate, comb, start=0):
+        truths = cls._evaluate_rows(props, evaluate, comb).astype(int)
+        return pd.DataFrame(truths, columns=[*props, *exprs], index=pd.RangeIndex(start, start + len(comb)))
+
+    def compile(self):
+        """
+        Returns a function that evaluates this expression under a context, a mapping from
+        proposition names to truth values or to boolean `numpy.ndarray` columns.
+        The function is generated by `LogicalCompiler` on the first call and cached
+        on this expression, so repeated evaluations cost a single function call.
+        """
+
+        try:
+            return self._compiled
+        except AttributeError:
+            self._compiled = LogicalCompiler()(self)
+            return self._compiled
+
+    def find_model(self, method='auto', chunk_size=2**16):
+        """
+        Returns a combination of the parameters in this expression that makes it true, or
+        `None` if there is none. Only the expression itself is evaluated and the search
+        stops at the first such combination.
+
+        :param method: 'table' to walk the truth table in chunks of `chunk_size` rows,
+        'search' to split on one proposition at a time and simplify the expression under
+        each partial assignment (in the manner of DPLL), or 'auto' to use 'table' unless
+        there are more than `table_max_props` propositions
 
-        for vals in comb:
-            evaluator.context = contextualize(props, vals)
-            truths.append((vals.tolist() + [evaluator(e) for e in exprs]))
+        :return: a `dict` mapping every proposition name in this expression to 1 or 0,
+        or `None` if this expression is unsatisfiable
 
-        columns = [*props, *exprs]
-        table = pd.DataFrame(truths, columns=columns)
+        :raise ValueError: if `method` is not supported
+        """
 
-        return table
+        props, _ = self._components()
+        if method == 'auto':
+            method = 'table' if len(props) <= self.table_max_props else 'search'
 
-    def is_equivalent(self, other):
-        return np.array_equal(self.tabulate().values[:, -1], other.tabulate().values[:, -1])
+        if method == 'table':
+            evaluate = self.compile()
+            for comb in combination_chunks(len(props), chunk_size, dtype=bool):
+                rows = np.flatnonzero(evaluate({p.name: comb[:, i] for i, p in enumerate(props)}))
+                if rows.size:
+                    return dict(zip([p.name for p in props], comb[rows[0]].astype(int).tolist()))
+            return None
+        elif method == 'search':
+            assignment = _search_model(self, {})
+            return None if assignment is None \
+                else {p.name: int(assignment.get(p.name, False)) for p in props}
+        else:
+            raise ValueError('unsupported method %s' % repr(method))
+
+    def is_satisfiable(self, method='auto', chunk_size=2**16):
+        """Returns whether some combination of the parameters makes this expression true."""
+
+        return self.find_model(method, chunk_size) is not None
+
+    def is_tautology(self, method='auto', chunk_size=2**16):
+        """Returns whether every combination of the parameters makes this expression true."""
+
+        return not LogicalNot(self).is_satisfiable(method, chunk_size)
+
+    def is_equivalent(self, other, method='auto', chunk_size=2**16):
+        """
+        Returns whether this expression and `other` agree for every combination of
+        their parameters, stopping at the first combination where they differ.
+        """
+
+        return not ((self & ~other) | (~self & other)).is_satisfiable(method, chunk_size)
+
+    table_max_props = 20
 
 
 class Proposition(LogicalExpression, pymbolic.primitives.Variable):
@@ -84,6 +223,8 @@ class LogicalOr(LogicalExpression, pymbolic.primitives.BitwiseOr):
 
 
 class IfThen(LogicalExpression):
+    init_arg_names = ('condition', 'then')
+
     def __init__(self, condition, then):
         self.condition = condition
         self.then = then
@@ -111,28 +252,49 @@ class IfThenStringifier(pymbolic.mapper.stringifier.StringifyMapper):
 
 class LogicalSplitter(pymbolic.mapper.RecursiveMapper):
     """
-    A LogicalSplitter recursively splits a logical expression tree into its component expressions.
-
-    >>> p, q, r = Proposition('p'), Proposition('q'), Proposition('r')
-    >>> e = p & q | r
-    >>> LogicalSplitter()(e)
-    [LogicalOr((LogicalAnd((Proposition('p'), Proposition('q'))), Proposition('r'))),
-    ... LogicalAnd((Proposition('p'), Proposition('q'))), Proposition('p'), Proposition('q'), Proposition('r')]
+    A LogicalSplitter splits a logical expression tree into its distinct component expressions.
+
+    Identical subexpressions are hash-consed: each is visited and listed once, as the first
+    instance found, so the result is the DAG of the expression in topological order where
+    every component comes after its operands.
+
+    >>> p, q = Proposition('p'), Proposition('q')
+    >>> e = p & q | ~(p & q)
+    >>> LogicalSplitter()(e)  # doctest: +NORMALIZE_WHITESPACE
+    [Proposition('p'), Proposition('q'), LogicalAnd((Proposition('p'), Proposition('q'))),
+    LogicalNot(LogicalAnd((Proposition('p'), Proposition('q')))),
+    LogicalOr((LogicalAnd((Proposition('p'), Proposition('q'))), LogicalNot(LogicalAnd((Proposition('p'),
+    Proposition('q'))))))]
     """
 
+    def rec(self, expr, *args, **kwargs):
+        try:
+            return self.components[expr]
+        except KeyError:
+            super(LogicalSplitter, self).rec(expr, *args, **kwargs)
+            self.components[expr] = expr
+            return expr
+
     def map_variable(self, expr, *args, **kwargs):
-        return [expr]
+        pass
 
     def map_bitwise_and(self, expr, *args, **kwargs):
-        return [expr, *[it for c in expr.children for it in self.rec(c, *args, **kwargs)]]
+        for c in expr.children:
+            self.rec(c, *args, **kwargs)
 
     map_bitwise_or = map_bitwise_and
 
     def map_bitwise_not(self, expr, *args, **kwargs):
-        return [expr, *self.rec(expr.child, *args, **kwargs)]
+        self.rec(expr.child, *args, **kwargs)
 
     def map_matstep_ifthen(self, expr, *args, **kwargs):
-        return [expr, *self.rec(expr.condition, *args, **kwargs), *self.rec(expr.then, *args, **kwargs)]
+        self.rec(expr.condition, *args, **kwargs)
+        self.rec(expr.then, *args, **kwargs)
+
+    def __call__(self, expr, *args, **kwargs):
+        self.components = {}
+        self.rec(expr, *args, **kwargs)
+        return [*self.components]
 
 
 class LogicalEvaluator(pymbolic.mapper.evaluator.EvaluationMapper):
@@ -151,8 +313,219 @@ class LogicalEvaluator(pymbolic.mapper.evaluator.EvaluationMapper):
         return int(not (self.rec(expr.condition) and not self.rec(expr.then)))
 
 
-def combination(n):
-    """Returns a combination of 1 and 0 given `n` parameters."""
+class LogicalCompiler(pymbolic.mapper.RecursiveMapper):
+    """
+    Compiles logical expressions into a Python function of a context, a mapping from
+    proposition names to truth values (`bool` or 0 and 1) or to boolean `numpy.ndarray`
+    columns. Every operator becomes a single Python operator in the generated source,
+    which NumPy vectorizes over columns, so evaluating the function never dispatches
+    through a mapper.
+
+    Calling a `LogicalCompiler` on an expression returns a function that evaluates it,
+    and calling it on a list of expressions returns a function that evaluates all of
+    them into a tuple. The generated source is kept in the `source` attribute of the
+    returned function.
+
+    >>> p, q = Proposition('p'), Proposition('q')
+    >>> print(LogicalCompiler()(p >> q).source)
+    def _logical(context):
+        _t0 = context['p']
+        _t1 = context['q']
+        _t2 = _t0 ^ True | _t1
+        return _t2
+    """
+
+    def _assign(self, expr, code):
+        name = '_t%d' % len(self.names)
+        self.names[expr] = name
+        self.lines.append('    %s = %s' % (name, code))
+        return name
+
+    def rec(self, expr):
+        try:
+            return self.names[expr]
+        except KeyError:
+            return super(LogicalCompiler, self).rec(expr)
+
+    def map_variable(self, expr):
+        return self._assign(expr, 'context[%s]' % repr(expr.name))
+
+    def map_bitwise_not(self, expr):
+        return self._assign(expr, '%s ^ True' % self.rec(expr.child))
+
+    def map_bitwise_and(self, expr):
+        return self._assign(expr, ' & '.join(self.rec(c) for c in expr.children))
+
+    def map_bitwise_or(self, expr):
+        return self._assign(expr, ' | '.join(self.rec(c) for c in expr.children))
+
+    def map_matstep_ifthen(self, expr):
+        return self._assign(expr, '%s ^ True | %s' % (self.rec(expr.condition), self.rec(expr.then)))
+
+    def __call__(self, expr):
+        self.names = {}
+        self.lines = []
+        if isinstance(expr, (list, tuple)):
+            result = '(%s)' % ''.join('%s, ' % self.rec(e) for e in expr)
+        else:
+            result = self.rec(expr)
+
+        source = 'def _logical(context):\n%s    return %s' % (''.join(line + '\n' for line in self.lines), result)
+        namespace = {}
+        exec(compile(source, '<matstep.logic.LogicalCompiler>', 'exec'), namespace)
+
+        function = namespace['_logical']
+        function.source = source
+        return function
+
+
+class LogicalReducer(pymbolic.mapper.RecursiveMapper):
+    """
+    Simplifies a logical expression under a partial assignment of its propositions.
+
+    The context maps proposition names to `True` or `False`. Operands that are decided
+    by the assignment are folded away, so the result is either `True`, `False` or the
+    logical expression over the unassigned propositions that remains to be decided.
+    """
+
+    def __init__(self, context):
+        self.context = context
+
+    def map_variable(self, expr):
+        return self.context.get(expr.name, expr)
+
+    def map_bitwise_not(self, expr):
+        child = self.rec(expr.child)
+        return (not child) if isinstance(child, bool) else LogicalNot(child)
+
+    def map_bitwise_and(self, expr):
+        children = [self.rec(c) for c in expr.children]
+        if any(c is False for c in children):
+            return False
+
+        children = [c for c in children if c is not True]
+        return True if not children else children[0] if len(children) == 1 else LogicalAnd(tuple(children))
+
+    def map_bitwise_or(self, expr):
+        children = [self.rec(c) for c in expr.children]
+        if any(c is True for c in children):
+            return True
+
+        children = [c for c in children if c is not False]
+        return False if not children else children[0] if len(children) == 1 else LogicalOr(tuple(children))
+
+    def map_matstep_ifthen(self, expr):
+        condition, then = self.rec(expr.condition), self.rec(expr.then)
+        if condition is False or then is True:
+            return True
+        if condition is True:
+            return then
+        if then is False:
+            return LogicalNot(condition)
+
+        return IfThen(condition, then)
+
+
+def _forced_literals(expr, value=True):
+    """
+    Returns the assignments of the propositions that `expr` requires in order to
+    evaluate to `value`, or `None` if the literals it requires contradict each other.
+    """
+
+    if isinstance(expr, Proposition):
+        return {expr.name: value}
+    if isinstance(expr, LogicalNot):
+        return _forced_literals(expr.child, not value)
+
+    if isinstance(expr, LogicalAnd) and value or isinstance(expr, LogicalOr) and not value:
+        required = [(c, value) for c in expr.children]
+    elif isinstance(expr, IfThen) and not value:
+        required = [(expr.condition, True), (expr.then, False)]
+    else:
+        return {}
+
+    forced = {}
+    for c, val in required:
+        child_forced = _forced_literals(c, val)
+        if child_forced is None:
+            return None
+        for name, child_val in child_forced.items():
+            if forced.setdefault(name, child_val) != child_val:
+                return None
+
+    return forced
+
+
+def _branch_proposition(expr):
+    """Returns the name of the proposition closest to the root of `expr`."""
+
+    level = [expr]
+    while level:
+        for e in level:
+            if isinstance(e, Proposition):
+                return e.name
+        level = [c for e in level
+                 for c in ((e.child, ) if isinstance(e, LogicalNot)
+                           else (e.condition, e.then) if isinstance(e, IfThen)
+                           else e.children)]
+
+
+def _search_model(expr, assignment):
+    """
+    Returns an extension of `assignment` under which `expr` is true, or `None` if there
+    is none, by first assigning the literals `expr` forces and then splitting on the
+    proposition closest to the root of what remains.
+    """
+
+    forced = _forced_literals(expr)
+    if forced is None:
+        return None
+    if forced:
+        assignment = {**assignment, **forced}
+        expr = LogicalReducer(forced)(expr)
+
+    if isinstance(expr, bool):
+        return assignment if expr else None
+
+    name = _branch_proposition(expr)
+    for val in (True, False):
+        model = _search_model(LogicalReducer({name: val})(expr), {**assignment, name: val})
+        if model is not None:
+            return model
+
+    return None
+
+
+def combination(n, dtype=np.uint8):
+    """
+    Returns a combination of 1 and 0 given `n` parameters.
+
+    Row `i` holds the binary digits of `i`, most significant first, so the
+    matrix is built directly from bit shifts of the row indices.
+    """
+
+    return _combination_rows(n, 0, 2**n, dtype)
+
+
+def combination_chunks(n, chunk_size=2**16, dtype=np.uint8):
+    """
+    Yields the rows of `combination(n)` in consecutive blocks of at most
+    `chunk_size` rows, so that all 2^n combinations can be walked without
+    holding them in memory at once.
+    """
+
+    if chunk_size < 1:
+        raise ValueError('expected a positive chunk size, got %s instead' % str(chunk_size))
+
+    for start in range(0, 2**n, chunk_size):
+        yield _combination_rows(n, start, min(start + chunk_size, 2**n), dtype)
+
+
+def _combination_rows(n, start, stop, dtype):
+    indices = np.arange(start, stop, dtype=np.uint64)
+    rows = np.empty((indices.size, n), dtype=dtype)
 
-    return np.array([[int(c) for c in [*('{0:0' + str(n) + 'b}').format(i)]] for i in range(2**n)])
+    for j in range(n):
+        rows[:, j] = (indices >> np.uint64(n - 1 - j)) & np.uint64(1)
 
+    return rows
@@ -1,5 +1,9 @@
+import functools
+import numbers
+from fractions import Fraction
+
 import numpy as np
-from pymbolic.primitives import Sum, Product, Call, Expression
+from pymbolic.primitives import Sum, Product, Power, Quotient, FloorDiv, Call, Expression
 
 from matstep.equalizer import equals
 from matstep.functions import Function
@@ -7,11 +11,52 @@ from matstep.stringifiers import StepStringifier
 
 
 class Determinant(Function):
-    """A `Determinant` function computes the determinant of the given matrix"""
+    """
+    A `Determinant` function computes the determinant of the given matrix.
+
+    The determinant is expanded with one of the following strategies:
+
+    - `'cofactor'`: Laplace expansion along the row or column with the most zeros,
+      which reads naturally for small matrices but grows into an expression with up to
+      n! terms. Each distinct minor is expanded once and shared by every term that
+      needs it, so simplifying the expansion takes roughly 2^n steps of work.
+    - `'bareiss'`: fraction-free Gaussian elimination, in which each step condenses the
+      matrix into one with a row and a column less, so the determinant takes n - 1 steps
+      of polynomial cost. Integer matrices stay integer all the way down.
+    - `'auto'`: cofactor expansion for matrices of at most `cofactor_max_size` rows,
+      Bareiss elimination otherwise.
+    """
 
     name = 'det'
     arg_count = 1
     mapper_method = 'map_matstep_det_func'
+    init_arg_names = ('strategy', )
+
+    strategies = ('auto', 'cofactor', 'bareiss')
+    cofactor_max_size = 4
+
+    def __init__(self, strategy='auto'):
+        """
+        :param strategy: one of `Determinant.strategies`
+
+        :raise ValueError: if strategy is not one of `Determinant.strategies`
+        """
+
+        if strategy not in self.strategies:
+            raise ValueError('unknown strategy %r, expected one of %s' % (strategy, ', '.join(self.strategies)))
+        self.strategy = strategy
+
+        # calls on minors keyed by the matrix they were taken from and the rows and
+        # columns removed from it, along with where each minor was taken from, kept
+        # for the cofactor expansion of one root matrix at a time
+        self._minors = {}
+        self._origins = {}
+
+    def __getinitargs__(self):
+        return self.strategy,
+
+    def __setstate__(self, state):
+        self.__init__(*state)
 
     def __call__(self, array):
         """
@@ -34,6 +79,8 @@ class Determinant(Function):
             raise ValueError('non-square matrix')
         if rows == 1:
             return array[0][0]
+        if self.strategy == 'bareiss' or self.strategy == 'auto' and rows > self.cofactor_max_size:
+            return _bareiss_step(array, 1)
         if rows == 2:
             return Sum((Product((array[0][0], array[1][1])), Product((-array[0][1], array[1][0]))))
 
@@ -43,17 +90,170 @@ class Determinant(Function):
             # upper or lower triangular matrix
             return Product(tuple(entry for entry in array.diagonal()))
 
-        def _minor(arr, i, j):
-            return np.delete(np.delete(arr, i, axis=0), j, axis=1)
+        origin = self._origin(array)
+        zeros = array == 0
+        for k in range(1, rows):
+            if zeros[k:, :k].all() or zeros[:k, k:].all():
+                # block triangular matrix -> product of the determinants of the diagonal blocks
+                return Product((self._minor(array, origin, range(k, rows), range(k, cols)),
+                                self._minor(array, origin, range(k), range(k))))
+
+        # expand along the row or column with the most zeros, rows first on ties
+        row_zeros, col_zeros = zeros.sum(axis=1), zeros.sum(axis=0)
+        i, j = row_zeros.argmax(), col_zeros.argmax()
+        if col_zeros[j] > row_zeros[i]:
+            line = [(k, j) for k in range(rows)]
+        else:
+            line = [(i, k) for k in range(cols)]
+
+        def _coeff_det(i, j):
+            coeff = array[i][j]
+            return Product((coeff if (i + j) % 2 == 0 else -coeff, self._minor(array, origin, (i, ), (j, ))))
+
+        terms = tuple(_coeff_det(i, j) for i, j in line if not zeros[i][j])
+        if not terms:
+            return 0
+        return terms[0] if len(terms) == 1 else Sum(terms)
+
+    def _origin(self, array):
+        """
+        Returns the matrix `array` was taken from as a minor and its key along with the
+        sets of rows and columns removed from it, or `array` itself with nothing removed,
+        or `None` if the entries of `array` can not be hashed.
 
-        def _coeff_det(coeff, j):
-            return Product((coeff if j % 2 == 0 else -coeff, Call(self, (_minor(array, 0, j), ))))
+        A matrix that is not a recorded minor starts a new expansion, so the minors
+        shared by the previous expansion are dropped rather than kept for good.
+        """
 
-        coeffs = array[0]
-        return Sum(tuple(_coeff_det(c, j) for j, c in enumerate(coeffs)))
+        try:
+            key = _matrix_key(array)
+        except TypeError:
+            return None
+
+        try:
+            return self._origins[key]
+        except KeyError:
+            self._minors.clear()
+            self._origins.clear()
+            return array, key, frozenset(), frozenset()
+
+    def _minor(self, array, origin, rows, cols):
+        """
+        Returns the determinant of `array` without the given rows and columns, which is
+        the entry left if only one is, otherwise a call to this function that is shared
+        by every minor removing the same rows and columns from the same matrix.
+        """
+
+        if len(rows) == array.shape[0] - 1:
+            i, = set(range(array.shape[0])) - set(rows)
+            j, = set(range(array.shape[1])) - set(cols)
+            return array[i][j]
+        if origin is None:
+            return Call(self, (np.delete(np.delete(array, rows, axis=0), cols, axis=1), ))
+
+        root, root_key, removed_rows, removed_cols = origin
+        kept_rows = [r for r in range(root.shape[0]) if r not in removed_rows]
+        kept_cols = [c for c in range(root.shape[1]) if c not in removed_cols]
+        key = (root_key,
+               removed_rows.union(kept_rows[r] for r in rows),
+               removed_cols.union(kept_cols[c] for c in cols))
+
+        try:
+            return self._minors[key]
+        except KeyError:
+            pass
+
+        minor = root[np.ix_([r for r in kept_rows if r not in key[1]], [c for c in kept_cols if c not in key[2]])]
+        self._minors[key] = call = Call(self, (minor, ))
+        self._origins.setdefault(_matrix_key(minor), (root, root_key, key[1], key[2]))
+        return call
+
+
+def _matrix_key(array):
+    """
+    Returns a hashable key of the entries of `array`, which is the same for any two
+    matrices with numerically equal entries.
+
+    :raise TypeError: if an entry of `array` is not hashable
+    """
+
+    key = array.shape, tuple(array.flat)
+    hash(key)
+    return key
+
+
+class CondensedDeterminant(Function):
+    """
+    A `CondensedDeterminant` function computes the determinant of the given matrix
+    divided by the given divisor to the power of one less than the order of the matrix.
+    It is the form the determinant takes after each step of Bareiss elimination, where
+    the divisor is the pivot of the previous step.
+    """
+
+    name = 'det'
+    arg_count = 2
+    mapper_method = 'map_matstep_condensed_det_func'
+
+    def __call__(self, array, divisor):
+        """
+        :param array: a square `numpy.ndarray` condensed by a previous Bareiss step
+
+        :param divisor: the pivot of the previous Bareiss step
+        """
+
+        if array.shape[0] == 1:
+            return array[0][0]
+        return _bareiss_step(array, divisor)
+
+
+def _bareiss_step(array, divisor):
+    """
+    Condenses `array` into the matrix of the next Bareiss elimination step, whose
+    entries are `(pivot * a[i][j] - a[i][0] * a[0][j]) / divisor` for the rows and
+    columns after the pivot. The division is exact, so it is a floor division when
+    every entry of `array` is an integer.
+    """
+
+    if any(isinstance(el, Expression) for el in array.flat):
+        # the pivot is unknown until the entries are simplified
+        return Call(CondensedDeterminant(), (array, divisor))
+
+    nonzero = np.nonzero(array[:, 0])[0]
+    if nonzero.size == 0:
+        # the first column is zero
+        return 0
+
+    i = nonzero[0]
+    if i != 0:
+        # swapping two rows flips the sign of the determinant
+        swapped = array.copy()
+        swapped[[0, i]] = array[[i, 0]]
+        return Product((-1, Call(CondensedDeterminant(), (swapped, divisor))))
+
+    div_type = Quotient
+    if all(isinstance(el, numbers.Integral) for el in array.flat):
+        # python integers do not overflow as the entries grow into larger minors
+        array = np.array([int(el) for el in array.flat], dtype=object).reshape(array.shape)
+        div_type = FloorDiv
+
+    pivot = array[0][0]
+
+    def _entry(i, j):
+        entry = Sum((Product((pivot, array[i][j])), Product((-array[i][0], array[0][j]))))
+        return entry if divisor == 1 else div_type(entry, divisor)
+
+    rows, _ = array.shape
+    condensed = np.empty((rows - 1, rows - 1), dtype=object)
+    for i in range(1, rows):
+        for j in range(1, rows):
+            condensed[i - 1][j - 1] = _entry(i, j)
+
+    return Call(CondensedDeterminant(), (condensed, pivot))
 
 
 class _VectorProduct(Expression):
+    init_arg_names = ('lvec', 'rvec')
+
     def __init__(self, lvec, rvec):
         self.lvec = lvec
         self.rvec = rvec
@@ -98,10 +298,114 @@ class CrossProductStringifier(StepStringifier):
             PREC_PRODUCT)
 
 
+class CowMatrix(object):
+    """
+    An immutable matrix stored as a list of read-only rows, which the elementary row
+    operations share between the matrix and its result. A row operation on a
+    `CowMatrix` allocates only the rows it changes, while every earlier matrix stays
+    as it was, so that a trace of gaussian elimination steps does not hold a full
+    copy of the matrix per step.
+
+    The rows keep the dtype they are computed in, e.g. scaling a row of an integer
+    matrix yields a float row instead of truncating it.
+
+    >>> import numpy as np
+    >>> from matstep.matrices import CowMatrix, RowAdd
+    >>> A = CowMatrix(np.array([[1, 2], [3, 4]]))
+    >>> B = RowAdd(1, -3, 0, A).apply()
+    >>> B.rows[0] is A.rows[0], B[1]
+    (True, array([ 0, -2]))
+    """
+
+    def __init__(self, matrix):
+        """
+        :param matrix: a 2-D `numpy.ndarray` or a sequence of rows, which are copied
+        unless they are read-only `numpy.ndarray` rows such as those of a `CowMatrix`
+        """
+
+        self.rows = [self._freeze(row) for row in matrix]
+
+    @staticmethod
+    def _freeze(row, owned=False):
+        if not owned and (not isinstance(row, np.ndarray) or row.flags.writeable):
+            row = np.array(row)
+        row.flags.writeable = False
+        return row
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.rows[0]) if self.rows else 0
+
+    @property
+    def dtype(self):
+        return np.result_type(*self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.rows, dtype=dtype or self.dtype).reshape(self.shape)
+
+    def __getitem__(self, key):
+        if isinstance(key, numbers.Integral):
+            return self.rows[key]
+
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(rows, numbers.Integral):
+            return self.rows[rows][cols]
+
+        indices = range(len(self.rows))[rows] if isinstance(rows, slice) else rows
+        return np.array([self.rows[i][cols] for i in indices], dtype=self.dtype)
+
+    def replace_rows(self, changes):
+        """
+        :param changes: a dict of the row indices to their new rows, which are owned by
+        the result and must not be modified afterwards
+
+        :return: a `CowMatrix` sharing every other row with this matrix
+        """
+
+        result = CowMatrix(())
+        result.rows = [*self.rows]
+        for i, row in changes.items():
+            result.rows[i] = self._freeze(row, owned=True)
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, CowMatrix) and self.shape == other.shape \
+            and all(a is b or np.array_equal(a, b) for a, b in zip(self.rows, other.rows))
+
+    __hash__ = None
+
+    def __setstate__(self, state):
+        self.rows = [self._freeze(row, owned=True) for row in state['rows']]
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, np.asarray(self))
+
+
 class _RowOp(Expression):
     def make_stringifier(self, originating_stringifier=None):
         return RowOpStringifier()
 
+    def apply(self, inplace=False):
+        """
+        Applies this operation to its `numpy.ndarray` or `CowMatrix` operand matrix.
+
+        :param inplace: whether to modify a `numpy.ndarray` operand matrix instead of a
+        copy; a `CowMatrix` is never modified
+
+        :return: the resulting matrix
+        """
+
+        if isinstance(self.mat, CowMatrix):
+            return self.mat.replace_rows(self.changed_rows(self.mat))
+
+        mat = self.mat if inplace else self.mat.copy()
+        for i, row in self.changed_rows(mat).items():
+            mat[i] = row
+        return mat
+
     def __eq__(self, other):
         return type(other) == type(self) and equals(self.__getinitargs__(), other.__getinitargs__())
 
@@ -114,8 +418,12 @@ class RowOpStringifier(StepStringifier):
 
     map_matstep_row_add = map_matstep_row_swap
 
+    map_matstep_column_swap = map_matstep_row_swap
+
 
 class RowSwap(_RowOp):
+    init_arg_names = ('i', 'j', 'mat')
+
     def __init__(self, i, j, mat):
         self.i = i
         self.j = j
@@ -124,10 +432,18 @@ class RowSwap(_RowOp):
     def __getinitargs__(self):
         return self.i, self.j, self.mat
 
+    def changed_rows(self, mat):
+        """Returns a dict of the indices of the rows of `mat` changed by this operation to their new rows."""
+
+        return {self.i: mat[self.j], self.j: mat[self.i]} if isinstance(mat, CowMatrix) \
+            else {self.i: mat[self.j].copy(), self.j: mat[self.i].copy()}
+
     mapper_method = 'map_matstep_row_swap'
 
 
 class RowMul(_RowOp):
+    init_arg_names = ('i', 'k', 'mat')
+
     def __init__(self, i, k, mat):
         self.i = i
         self.k = k
@@ -136,10 +452,15 @@ class RowMul(_RowOp):
     def __getinitargs__(self):
         return self.i, self.k, self.mat
 
+    def changed_rows(self, mat):
+        return {self.i: self.k * mat[self.i]}
+
     mapper_method = 'map_matstep_row_mul'
 
 
 class RowAdd(_RowOp):
+    init_arg_names = ('i', 'k', 'j', 'mat')
+
     def __init__(self, i, k, j, mat):
         self.i = i
         self.k = k
@@ -149,4 +470,425 @@ class RowAdd(_RowOp):
     def __getinitargs__(self):
         return self.i, self.k, self.j, self.mat
 
+    def changed_rows(self, mat):
+        return {self.i: mat[self.i] + self.k * mat[self.j]}
+
     mapper_method = 'map_matstep_row_add'
+
+
+class ColumnSwap(_RowOp):
+    """
+    The swap of the columns `i` and `j` of `mat`, which full pivoting uses to bring
+    the pivot into the pivot column. The gaussian elimination then reduces the matrix
+    with its columns permuted by the column swaps.
+    """
+
+    init_arg_names = ('i', 'j', 'mat')
+
+    def __init__(self, i, j, mat):
+        self.i = i
+        self.j = j
+        self.mat = mat
+
+    def __getinitargs__(self):
+        return self.i, self.j, self.mat
+
+    def changed_rows(self, mat):
+        perm = np.arange(mat.shape[1])
+        perm[[self.i, self.j]] = self.j, self.i
+        return {i: mat[i][perm] for i in range(mat.shape[0])}
+
+    mapper_method = 'map_matstep_column_swap'
+
+
+class PivotStrategy(object):
+    """
+    Chooses the pivot of each column in the gaussian elimination of a matrix.
+    Subclasses override `PivotStrategy.pivot`.
+
+    A 1 already at the pivot position is always kept as the pivot, since the pivot
+    row is scaled to 1 before the other rows are cleared and the pivot must then
+    stay put while its column is reduced.
+    """
+
+    def pivot(self, mat, h, k):
+        """
+        :param mat: the simplified `numpy.ndarray` being reduced
+
+        :param h: the row index of the pivot position
+
+        :param k: the column index of the pivot position
+
+        :return: the row and column indices of the entry to swap into the pivot
+        position, with the row index at least h and the column index at least k, or
+        `None` if the k-th column has no pivot and the next column is to be searched
+        """
+
+        raise NotImplementedError
+
+
+class FirstNonzeroPivot(PivotStrategy):
+    """Chooses the first entry equal to 1 in the pivot column, else its first nonzero entry."""
+
+    def pivot(self, mat, h, k):
+        sub_col = mat[h:, k]
+        nonzero = np.flatnonzero(sub_col != 0)
+        if nonzero.size == 0:
+            return None
+
+        ones = np.flatnonzero(sub_col == 1)
+        return (nonzero[0] if ones.size == 0 else ones[0]) + h, k
+
+
+class PartialPivot(PivotStrategy):
+    """
+    Chooses the entry of the pivot column with the largest absolute value, so that the
+    multiples of the pivot row added to the other rows never grow their entries.
+    """
+
+    def pivot(self, mat, h, k):
+        sub_col = abs(mat[h:, k])
+        i = np.argmax(sub_col)
+        if sub_col[i] == 0:
+            return None
+
+        return i + h, k
+
+
+class FullPivot(PivotStrategy):
+    """
+    Chooses the entry of the lower right submatrix with the largest absolute value,
+    which is brought into the pivot column with a `ColumnSwap`.
+    """
+
+    def __init__(self, columns=None):
+        """
+        :param columns: the number of leading columns searched for pivots, e.g. those
+        of the coefficients of an augmented matrix, or `None` for all the columns
+        """
+
+        self.columns = columns
+
+    def pivot(self, mat, h, k):
+        if self.columns is not None and k >= self.columns:
+            return FirstNonzeroPivot().pivot(mat, h, k)
+
+        sub_mat = abs(mat[h:, k:self.columns])
+        i, j = np.unravel_index(np.argmax(sub_mat), sub_mat.shape)
+        if sub_mat[i, j] == 0:
+            return None
+
+        return i + h, j + k
+
+
+pivot_strategies = {'first': FirstNonzeroPivot, 'partial': PartialPivot, 'full': FullPivot}
+
+
+def pivot_strategy(pivoting):
+    """
+    :param pivoting: a `PivotStrategy` or one of the keys of `pivot_strategies`
+
+    :return: the `PivotStrategy` for pivoting
+
+    :raise ValueError: if pivoting is neither a `PivotStrategy` nor a known name
+    """
+
+    if isinstance(pivoting, PivotStrategy):
+        return pivoting
+    if pivoting not in pivot_strategies:
+        raise ValueError('unknown pivoting %r, expected a PivotStrategy or one of %s'
+                         % (pivoting, ', '.join(pivot_strategies)))
+
+    return pivot_strategies[pivoting]()
+
+
+def next_row_op(mat, h, k, strategy):
+    """
+    Finds the next elementary operation in the gaussian elimination of `mat`.
+
+    :param mat: the simplified `numpy.ndarray` being reduced
+
+    :param h: the row index of the pivot position
+
+    :param k: the column index of the pivot position
+
+    :param strategy: the `PivotStrategy` choosing the pivot
+
+    :return: a tuple of the `_RowOp` subclass of the operation and its arguments
+    without the matrix, or a tuple of `None` and the next pivot position if the
+    k-th column needs no further operations
+    """
+
+    pivot = (h, k) if mat[h][k] == 1 else strategy.pivot(mat, h, k)
+    if pivot is None:
+        # lower row elements in k-th col are zero -> pass to the next column
+        return None, (h, k + 1)
+
+    i, j = pivot
+    if j != k:
+        # pivot not at expected column -> swap columns
+        return ColumnSwap, (k, j)
+    if i != h:
+        # pivot not at expected row -> swap rows
+        return RowSwap, (h, i)
+
+    pivot = mat[h][k]
+    if pivot != 1:
+        # multiply row so pivot == 1
+        return RowMul, (h, 1/pivot)
+
+    nonzero = np.flatnonzero(mat[:, k] != 0)
+    nonzero = nonzero[nonzero != h]
+    if nonzero.size > 0:
+        # other values in pivot column are not zero -> make them zero one-by-one
+        i = nonzero[0]
+        return RowAdd, (i, -mat[i][k], h)
+
+    # pivot column verified -> pass to the next row and column
+    return None, (h + 1, k + 1)
+
+
+class RowReducer(object):
+    """
+    An elimination engine that reduces a numeric or `fractions.Fraction` matrix to its
+    reduced row echelon form with the same elementary row operations as
+    `matstep.simplifiers.MatrixSimplifier.all_gaussian_steps`.
+
+    The engine keeps the pivot position `(h, k)` and a working copy of the matrix in
+    `matrix`. Iterating over it yields each `RowSwap`, `RowMul`, `RowAdd` or
+    `ColumnSwap` record before the operation is applied to the working copy in place,
+    so a step only touches the pivot column and the one or two rows it changes. The
+    matrix of each record is a `CowMatrix` snapshot of the working copy, which shares
+    its unchanged rows with the snapshots of the other records and stays valid once
+    the iteration moves on.
+
+    >>> import numpy as np
+    >>> from matstep.matrices import RowReducer
+    >>> reducer = RowReducer(np.array([[2, 4], [1, 3]]))
+    >>> [type(row_op).__name__ for row_op in reducer]
+    ['RowSwap', 'RowAdd', 'RowMul', 'RowAdd']
+    >>> np.array_equal(np.eye(2), reducer.matrix)
+    True
+    """
+
+    def __init__(self, matrix, h=0, k=0, exact=False, pivoting='first'):
+        """
+        :param matrix: a numeric `numpy.ndarray` or an object `numpy.ndarray` of numbers
+        such as `fractions.Fraction`; integer matrices are reduced as floats unless exact.
+        A `CowMatrix` is reduced without copies, so that `matrix` and the matrix of each
+        yielded record is a distinct immutable step sharing its unchanged rows
+
+        :param h: the row index of the starting pivot
+
+        :param k: the column index of the starting pivot
+
+        :param exact: whether to reduce a copy of the matrix whose entries are converted to
+        `fractions.Fraction` instances, so that no rounding error creeps into the zero and
+        one checks of the pivot search
+
+        :param pivoting: a `PivotStrategy` or one of the keys of `pivot_strategies`
+
+        :raise TypeError: if matrix is neither numeric nor an object `numpy.ndarray` nor
+        a `CowMatrix`
+
+        :raise ValueError: if pivoting is neither a `PivotStrategy` nor a known name
+        """
+
+        if isinstance(matrix, CowMatrix):
+            self.matrix = CowMatrix(to_fractions(np.asarray(matrix))) if exact else matrix
+        elif exact and isinstance(matrix, np.ndarray):
+            self.matrix = to_fractions(matrix)
+        elif is_numeric(matrix):
+            self.matrix = matrix.astype(np.result_type(matrix.dtype, float))
+        elif isinstance(matrix, np.ndarray) and matrix.dtype == object:
+            self.matrix = matrix.copy()
+        else:
+            raise TypeError('expected a numeric numpy.ndarray, got %s instead' % str(type(matrix)))
+
+        self.h = h
+        self.k = k
+        self.pivoting = pivot_strategy(pivoting)
+
+    def __iter__(self):
+        rows, cols = self.matrix.shape
+        snapshot = None
+
+        while self.h < rows and self.k < cols:
+            op_type, args = next_row_op(self.matrix, self.h, self.k, self.pivoting)
+            if op_type is None:
+                self.h, self.k = args
+                continue
+
+            if isinstance(self.matrix, CowMatrix):
+                row_op = op_type(*args, self.matrix)
+                yield row_op
+                self.matrix = row_op.apply()
+                continue
+
+            if snapshot is None:
+                snapshot = CowMatrix(self.matrix)
+            yield op_type(*args, snapshot)
+
+            changes = op_type(*args, self.matrix).changed_rows(self.matrix)
+            for i, row in changes.items():
+                self.matrix[i] = row
+            # the new rows are copied into the working copy and left to the snapshot
+            snapshot = snapshot.replace_rows(changes)
+
+    def reduce(self):
+        """Applies the remaining row operations and returns the reduced row echelon form."""
+
+        for _ in self:
+            pass
+        return self.matrix
+
+
+class _LazyMatrix(Expression):
+    """
+    A step of an operation on numeric matrices whose entries are expressions of the
+    entries of the operands. The value of the operation is computed with whole-array
+    NumPy calls when the step is simplified, while the matrix of expressions is only
+    built when the step is displayed.
+    """
+
+    mapper_method = 'map_matstep_lazy_matrix'
+
+    def entries(self):
+        """Returns the `numpy.ndarray` of the expressions of each entry."""
+
+        raise NotImplementedError
+
+    def value(self):
+        """Returns the `numpy.ndarray` the entries simplify to."""
+
+        raise NotImplementedError
+
+    def make_stringifier(self, originating_stringifier=None):
+        return LazyMatrixStringifier()
+
+    def __eq__(self, other):
+        return type(other) == type(self) and equals(self.__getinitargs__(), other.__getinitargs__())
+
+
+class LazyMatrixStringifier(StepStringifier):
+    def map_matstep_lazy_matrix(self, expr, enclosing_prec, *args, **kwargs):
+        return self.rec(expr.entries(), enclosing_prec, *args, **kwargs)
+
+
+class LazySum(_LazyMatrix):
+    """The entrywise sum of numeric matrices of the same shape."""
+
+    init_arg_names = ('children', )
+
+    def __init__(self, children):
+        self.children = children
+
+    def __getinitargs__(self):
+        return self.children,
+
+    def entries(self):
+        return np.frompyfunc(lambda *els: Sum(els), len(self.children), 1)(*self.children)
+
+    def value(self):
+        return functools.reduce(np.add, self.children)
+
+
+class LazyDiagonalPower(_LazyMatrix):
+    """The power of a numeric diagonal matrix, which raises its diagonal to the exponent."""
+
+    init_arg_names = ('base', 'exponent')
+
+    def __init__(self, base, exponent):
+        self.base = base
+        self.exponent = exponent
+
+    def __getinitargs__(self):
+        return self.base, self.exponent
+
+    def entries(self):
+        return np.diag([Power(el, self.exponent) for el in self.base.diagonal()])
+
+    def value(self):
+        return np.diag(self.base.diagonal() ** self.exponent)
+
+
+class LazyMatrixProduct(_LazyMatrix):
+    """The matrix product of two numeric matrices."""
+
+    init_arg_names = ('lmat', 'rmat')
+
+    def __init__(self, lmat, rmat):
+        self.lmat = lmat
+        self.rmat = rmat
+
+    def __getinitargs__(self):
+        return self.lmat, self.rmat
+
+    def entries(self):
+        return matrix_product_entries(self.lmat, self.rmat)
+
+    def value(self):
+        return self.lmat @ self.rmat
+
+
+def matrix_product_entries(lmat, rmat):
+    """
+    Returns the `numpy.ndarray` of the matrix product of `lmat` and `rmat` whose every
+    entry is the sum of the products of a row of `lmat` and a column of `rmat`.
+
+    :raise ValueError: if the number of columns of `lmat` is not the number of rows of `rmat`
+    """
+
+    if lmat.shape[1] != rmat.shape[0]:
+        # mat1 cols must equal mat2 rows
+        raise ValueError('mismatched dimensions %s and %s' % (str(lmat.shape), str(rmat.shape)))
+
+    entries = np.empty((lmat.shape[0], rmat.shape[1]), dtype=object)
+    for i, row in enumerate(lmat):
+        for j, col in enumerate(rmat.T):
+            products = tuple(Product((el1, el2)) for el1, el2 in zip(row, col))
+            entries[i][j] = products[0] if len(products) == 1 else Sum(products)
+
+    return entries
+
+
+def diagonalize(array):
+    """
+    Diagonalizes the numeric square matrix `array` into `P`, `D` and the inverse of
+    `P` such that `array` is `P D P^-1`, where `D` is the diagonal matrix of the
+    eigenvalues of `array` and the columns of `P` are its eigenvectors. The matrices
+    are real unless `array` has complex eigenvalues.
+
+    :raise ValueError: if `array` is not diagonalizable
+    """
+
+    eigvals, eigvecs = np.linalg.eig(array)
+    if np.linalg.matrix_rank(eigvecs) < array.shape[0]:
+        raise ValueError('matrix is not diagonalizable')
+    if not np.iscomplexobj(array) and np.all(np.isreal(eigvals)):
+        eigvals, eigvecs = eigvals.real, eigvecs.real
+
+    return eigvecs, np.diag(eigvals), np.linalg.inv(eigvecs)
+
+
+def to_fractions(array):
+    """
+    Returns a copy of `array` as an object `numpy.ndarray` of `fractions.Fraction`
+    instances. Floats are converted to the exact value of their binary representation.
+
+    :raise TypeError: if an entry of `array` is not a real number
+    """
+
+    def _fraction(el):
+        if isinstance(el, Fraction):
+            return el
+        # numpy integers make fractions that can not be hashed
+        return Fraction(int(el) if isinstance(el, numbers.Integral) else float(el))
+
+    return np.array([_fraction(el) for el in array.flat], dtype=object).reshape(array.shape)
+
+
+def is_numeric(array):
+    """Returns whether `array` is a `numpy.ndarray` of booleans or numbers."""
+
+    return isinstance(array, np.ndarray) and array.dtype.kind in 'biufc'
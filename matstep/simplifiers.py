@@ -1,12 +1,249 @@
-import operator as op
+import asyncio
+import copy
+import numbers
+from collections import OrderedDict
 
 import numpy as np
 import sympy as sp
 from pymbolic.mapper import RecursiveMapper
 from pymbolic.primitives import Expression, Sum, Product, Power, Call
 
-from matstep.equalizer import equals
-from matstep.matrices import Determinant, RowSwap, RowMul, RowAdd
+from matstep.equalizer import equals, fingerprint, same_types
+from matstep.stringifiers import StepStringifier
+from matstep.matrices import (
+    Determinant, _RowOp, CowMatrix, RowSwap, RowMul, RowAdd, ColumnSwap, LazySum, LazyDiagonalPower, LazyMatrixProduct,
+    RowReducer, FirstNonzeroPivot, PartialPivot, matrix_product_entries, diagonalize, to_fractions, is_numeric,
+    pivot_strategy, next_row_op,
+)
+
+
+class StepCache(object):
+    """
+    A least recently used cache of simplification steps keyed by the structural
+    fingerprints of the simplified expressions.
+
+    Each entry keeps the simplified expression along with its step, so that two
+    expressions that only share a fingerprint by collision, or that are equal but hold
+    numbers of other types such as `1` and `1.0`, never share a step.
+    Steps that are `numpy.ndarray` instances are copied in and out of the cache
+    since matrices are mutated in place by elementary row operations.
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        :param maxsize: the maximum number of steps kept before the least recently
+        used one is evicted
+        """
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, expr):
+        """
+        Returns the cached step of `expr`.
+
+        :raise KeyError: if no step of an expression equal to `expr` with the same
+        types of numbers is cached
+        """
+
+        try:
+            cached_expr, step = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        if not equals(cached_expr, expr) or not same_types(cached_expr, expr):
+            self.misses += 1
+            raise KeyError(key)
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        if step is cached_expr:
+            # expr can not be simplified any further
+            return expr
+        return step.copy() if isinstance(step, np.ndarray) else step
+
+    def put(self, key, expr, step):
+        """Caches `step` as the next step of `expr`, evicting the least recently used step if full."""
+
+        self._entries[key] = expr, step.copy() if isinstance(step, np.ndarray) else step
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Removes every cached step and resets the counters."""
+
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '%s(hits=%d, misses=%d, evictions=%d, size=%d, maxsize=%d)' % (
+            self.__class__.__name__, self.hits, self.misses, self.evictions, len(self), self.maxsize)
+
+
+class StepTrace(object):
+    """
+    The steps of a simplification stored as its first and last steps and the change
+    from each step to the next, which is a list of deltas at paths of operand indices
+    into the step:
+
+    * the replacement of the changed subtree, or of the changed rows of a matrix;
+    * the wrapping of the subtree in a `matstep.matrices.RowSwap` and the like, stored
+      as its type and arguments without the matrix;
+    * the application of such a row operation to its matrix.
+
+    Any step is rebuilt on demand by replaying the deltas from the first step, so that
+    the unchanged parts of the steps are not kept once per step.
+
+    >>> from pymbolic.primitives import Sum
+    >>> from matstep.simplifiers import StepSimplifier
+    >>> trace = StepSimplifier().trace_steps(Sum((1, Sum((2, 3)))))
+    >>> len(trace), trace[1], trace[-1]
+    (3, Sum((1, 5)), 6)
+    """
+
+    _REPLACE, _WRAP, _APPLY = range(3)
+
+    def __init__(self, steps):
+        """
+        :param steps: an iterable of the steps, e.g. `StepSimplifier.all_steps`
+
+        :raise ValueError: if steps is empty
+        """
+
+        steps = iter(steps)
+        try:
+            self.first = self.last = next(steps)
+        except StopIteration:
+            raise ValueError('expected at least one step')
+
+        self._deltas = []
+        for step in steps:
+            self._deltas.append(self._delta(self.last, step))
+            self.last = step
+
+    def __len__(self):
+        return len(self._deltas) + 1
+
+    def __iter__(self):
+        step = self.first
+        yield step
+        for delta in self._deltas:
+            step = self._replay(step, delta)
+            yield step
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('step index out of range')
+        if index == len(self) - 1:
+            return self.last
+
+        step = self.first
+        for delta in self._deltas[:index]:
+            step = self._replay(step, delta)
+        return step
+
+    @staticmethod
+    def _same(a, b):
+        if a is b:
+            return True
+        if type(a) is not type(b):
+            return False
+        if isinstance(a, (np.ndarray, CowMatrix)):
+            if (a.shape, a.dtype) != (b.shape, b.dtype):
+                return False
+            pairs = zip(np.asarray(a).flat, np.asarray(b).flat)
+            if a.dtype == object and any(type(x) is not type(y) for x, y in pairs):
+                # e.g. exact gaussian elimination turns floats into equal fractions
+                return False
+        return fingerprint(a) == fingerprint(b) and equals(a, b)
+
+    @classmethod
+    def _delta(cls, prev, curr):
+        """Returns the list of changes from the step `prev` to the step `curr`."""
+
+        delta = []
+        stack = [((), prev, curr)]
+
+        while stack:
+            path, a, b = stack.pop()
+            if cls._same(a, b):
+                continue
+
+            if isinstance(b, _RowOp) and cls._same(a, b.mat):
+                delta.append((path, cls._WRAP, (type(b), b.__getinitargs__()[:-1])))
+            elif isinstance(a, _RowOp) and isinstance(a.mat, (np.ndarray, CowMatrix)) and cls._same(a.apply(), b):
+                delta.append((path, cls._APPLY, None))
+            elif type(a) is type(b) and isinstance(a, (Expression, tuple, list)):
+                a_ops = a.__getinitargs__() if isinstance(a, Expression) else a
+                b_ops = b.__getinitargs__() if isinstance(b, Expression) else b
+                if len(a_ops) != len(b_ops):
+                    delta.append((path, cls._REPLACE, b))
+                    continue
+                stack.extend((path + (i, ), a_op, b_op) for i, (a_op, b_op) in enumerate(zip(a_ops, b_ops)))
+            elif (isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.ndim > 1
+                  and (a.shape, a.dtype) == (b.shape, b.dtype)):
+                changed = [i for i in range(len(a)) if not equals(a[i], b[i])]
+                if len(changed) == len(a):
+                    delta.append((path, cls._REPLACE, b))
+                    continue
+                delta.extend((path + (i, ), cls._REPLACE, b[i].copy()) for i in changed)
+            else:
+                delta.append((path, cls._REPLACE, b))
+
+        return delta
+
+    @classmethod
+    def _replay(cls, step, delta):
+        """Returns the step following `step` by the list of changes `delta`."""
+
+        for path, kind, value in delta:
+            nodes = [step]
+            for i in path:
+                node = nodes[-1]
+                nodes.append(node.__getinitargs__()[i] if isinstance(node, Expression) else node[i])
+
+            if kind == cls._WRAP:
+                op_type, op_args = value
+                new = op_type(*op_args, nodes[-1])
+            elif kind == cls._APPLY:
+                new = nodes[-1].apply()
+            else:
+                new = value
+
+            for node, i in zip(reversed(nodes[:-1]), reversed(path)):
+                if isinstance(node, np.ndarray):
+                    node = node.copy()
+                    node[i] = new
+                    new = node
+                elif isinstance(node, Expression):
+                    ops = [*node.__getinitargs__()]
+                    ops[i] = new
+                    new = type(node)(*ops)
+                else:
+                    ops = [*node]
+                    ops[i] = new
+                    new = type(node)(ops)
+            step = new
+
+        return step
+
+
+# the number of nested operands simplified by recursion before the rest of the
+# subtree is simplified from an explicit stack
+_MAX_DEPTH = 32
 
 
 class StepSimplifier(RecursiveMapper):
@@ -17,8 +254,233 @@ class StepSimplifier(RecursiveMapper):
     the most simplied form, an expression returns a non-pymbolic
     object. The non-pymbolic operands of an expression should
     overload the necessary Python operators.
+
+    An incremental simplifier remembers the `pymbolic.primitives.Expression`
+    nodes that can not be simplified any further and never visits them again,
+    so the cost of a step is proportional to the part of the expression that
+    is still being simplified rather than the whole expression. A node that
+    can not be simplified is returned as is by every evaluation method.
+
+    A simplifier may also keep a bounded `StepCache` of the steps of the
+    `pymbolic.primitives.Expression` nodes it has simplified, keyed by their
+    structural fingerprints, so that a subexpression repeated across steps or
+    across expressions is simplified only once.
+
+    A simplifier given a `concurrent.futures.Executor` farms the operands of the
+    simplified expression out to it, e.g. the terms of a cofactor expansion or the
+    entries of an object matrix. Consecutive operands are batched up to
+    `parallel_threshold` nodes, and each batch is simplified by a copy of the
+    simplifier. The steps are the same as without an executor. Expressions sent to
+    a `concurrent.futures.ProcessPoolExecutor` are pickled, as is the copy of the
+    simplifier without its executor, cache entries and memo.
     """
 
+    def __init__(self, incremental=False, cache_size=None, executor=None, parallel_threshold=1000):
+        """
+        :param incremental: whether to remember the nodes that can not be
+        simplified any further and skip them in later steps
+
+        :param cache_size: the maximum number of steps kept in the `cache`
+        attribute, or `None` for no cache
+
+        :param executor: an optional `concurrent.futures.Executor` simplifying the
+        operands of an expression in parallel
+
+        :param parallel_threshold: the minimum number of nodes in a batch of operands
+        simplified by the executor, smaller remainders are simplified in this process
+        """
+
+        self.incremental = incremental
+        self.cache = StepCache(cache_size) if cache_size else None
+        self.executor = executor
+        self.parallel_threshold = parallel_threshold
+        self._normalized = {}
+        self._steps = None
+        self._depth = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(executor=None, _normalized={}, _steps=None, _depth=0,
+                     cache=StepCache(self.cache.maxsize) if self.cache is not None else None)
+        return state
+
+    def __call__(self, expr, *args, **kwargs):
+        """
+        Returns the next step in the simplification of `expr`.
+
+        The operands of `expr` are only simplified when the mapper of their parent
+        asks for their steps, so that the operands a step does not need are never
+        simplified. Past `_MAX_DEPTH` nested operands, the rest of the subtree is
+        simplified children first while walking it with an explicit stack, so that
+        arbitrarily deep expressions can be simplified without reaching the
+        recursion limit.
+        """
+
+        outer_steps, self._steps = self._steps, {}
+        try:
+            if self.executor is not None:
+                self._simplify_in_parallel(expr, *args, **kwargs)
+            return self.rec(expr, *args, **kwargs)
+        finally:
+            self._steps = outer_steps
+
+    def _simplify_in_parallel(self, expr, *args, **kwargs):
+        """
+        Simplifies the batches of operands of `expr` of at least `parallel_threshold`
+        nodes with the executor and keeps their steps like `_simplify_operands`.
+        """
+
+        if not isinstance(expr, Expression) and not (isinstance(expr, np.ndarray) and expr.dtype == object):
+            return
+
+        batches, batch, size, seen = [], [], 0, set()
+        for node in self._operands(expr):
+            if id(node) in seen or not isinstance(node, Expression) \
+                    and not (isinstance(node, np.ndarray) and node.dtype == object):
+                continue
+            seen.add(id(node))
+
+            batch.append(node)
+            size += _count_nodes(node, self.parallel_threshold - size)
+            if size >= self.parallel_threshold:
+                batches.append(batch)
+                batch, size = [], 0
+
+        futures = [(batch, self.executor.submit(_simplify_batch, copy.copy(self), batch, args, kwargs))
+                   for batch in batches]
+        for batch, future in futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+
+            for node, (step, error) in zip(batch, results):
+                self._steps[id(node)] = node, step, error
+
+    def _simplify_operands(self, expr, *args, **kwargs):
+        """
+        Simplifies every `pymbolic.primitives.Expression` and `numpy.ndarray` node
+        of `expr` children first and keeps their steps for `rec` to look up. An
+        error raised while simplifying a node is kept as well and only raised when
+        the step of the node is looked up, since a node does not always need the
+        steps of its operands.
+        """
+
+        steps = self._steps
+        seen = set()
+        stack = [(expr, False, None)]
+
+        while stack:
+            node, ready, key = stack.pop()
+
+            if ready:
+                try:
+                    if isinstance(node, Expression):
+                        steps[id(node)] = node, self._simplify(node, key, *args, **kwargs), None
+                    else:
+                        steps[id(node)] = node, super(StepSimplifier, self).rec(node, *args, **kwargs), None
+                except Exception as e:
+                    steps[id(node)] = node, None, e
+                continue
+
+            if id(node) in seen or not isinstance(node, Expression) \
+                    and not (isinstance(node, np.ndarray) and node.dtype == object):
+                # numeric matrices have no operands and are only simplified if needed
+                continue
+            seen.add(id(node))
+
+            if id(node) in steps:
+                # simplified by the executor
+                continue
+
+            if isinstance(node, Expression):
+                if self.incremental and id(node) in self._normalized:
+                    steps[id(node)] = node, node, None
+                    continue
+
+                key = self._cache_key(node, args, kwargs)
+                if key is not None:
+                    try:
+                        steps[id(node)] = node, self.cache.get(key, node), None
+                        continue
+                    except KeyError:
+                        pass
+
+            stack.append((node, True, key))
+            stack.extend((op, False, None) for op in reversed(self._operands(node)))
+
+    @staticmethod
+    def _operands(expr):
+        """Returns the operands of `expr` that are simplified before `expr` itself."""
+
+        if isinstance(expr, np.ndarray):
+            return [*expr.flat] if expr.dtype == object else []
+        if isinstance(expr, Call):
+            return [*expr.parameters]
+
+        operands = []
+        for arg in expr.__getinitargs__():
+            if isinstance(arg, (tuple, list)):
+                operands.extend(arg)
+            else:
+                operands.append(arg)
+        return operands
+
+    def _cache_key(self, expr, args, kwargs):
+        return fingerprint(expr) if self.cache is not None and not args and not kwargs else None
+
+    def rec(self, expr, *args, **kwargs):
+        steps = self._steps
+        if steps is not None:
+            if self._depth >= _MAX_DEPTH and id(expr) not in steps:
+                self._simplify_operands(expr, *args, **kwargs)
+
+            if id(expr) in steps:
+                _, step, error = steps[id(expr)]
+                if error is not None:
+                    raise error
+                if isinstance(step, np.ndarray):
+                    # matrices are mutated in place by elementary row operations
+                    del steps[id(expr)]
+                return step
+
+        self._depth += 1
+        try:
+            step = self._rec(expr, *args, **kwargs)
+        finally:
+            self._depth -= 1
+
+        if steps is not None and isinstance(expr, Expression) and not isinstance(step, np.ndarray):
+            # shared subexpressions are simplified once per step
+            steps[id(expr)] = expr, step, None
+        return step
+
+    def _rec(self, expr, *args, **kwargs):
+        if not isinstance(expr, Expression):
+            return super(StepSimplifier, self).rec(expr, *args, **kwargs)
+
+        if self.incremental and id(expr) in self._normalized:
+            return expr
+
+        key = self._cache_key(expr, args, kwargs)
+        try:
+            if key is not None:
+                return self.cache.get(key, expr)
+        except KeyError:
+            pass
+
+        return self._simplify(expr, key, *args, **kwargs)
+
+    def _simplify(self, expr, key, *args, **kwargs):
+        result = super(StepSimplifier, self).rec(expr, *args, **kwargs)
+        if key is not None:
+            self.cache.put(key, expr, result)
+        if self.incremental and result is expr:
+            # keep a reference so that the id is not reused by another node
+            self._normalized[id(expr)] = expr
+
+        return result
+
     def eval_unary_expr(self, expr, op_func, *args, **kwargs):
         """
         A helper method for evaluating single-operand `pymbolic
@@ -45,8 +507,11 @@ class StepSimplifier(RecursiveMapper):
         op, = expr.__getinitargs__()
         result = op_func(op, *args, **kwargs)
 
-        return result if not equals(result, expr) \
-            else expr_type(self.rec(op, *args, *kwargs))
+        if not equals(result, expr):
+            return result
+
+        eval_op = self.rec(op, *args, **kwargs)
+        return expr if eval_op is op else expr_type(eval_op)
 
     def eval_binary_expr(self, expr, op_func, *args, **kwargs):
         """
@@ -74,8 +539,11 @@ class StepSimplifier(RecursiveMapper):
         op1, op2 = expr.__getinitargs__()
         result = op_func(op1, op2, *args, **kwargs)
 
-        return result if not equals(result, expr) \
-            else expr_type(self.rec(op1, *args, **kwargs), self.rec(op2, *args, **kwargs))
+        if not equals(result, expr):
+            return result
+
+        eval_op1, eval_op2 = self.rec(op1, *args, **kwargs), self.rec(op2, *args, **kwargs)
+        return expr if eval_op1 is op1 and eval_op2 is op2 else expr_type(eval_op1, eval_op2)
 
     def eval_multichild_expr(self, expr, op_func, *args, **kwargs):
         """
@@ -108,16 +576,22 @@ class StepSimplifier(RecursiveMapper):
         operands = expr.__getinitargs__()[0]  # it returns a tuple of its attributes (only children which is a tuple)
         last_operand = None
         result = []
+        unchanged = True
 
         for operand in operands:
             eval_operand = self.rec(operand, *args, **kwargs)
             if isinstance(operand, Expression) or isinstance(last_operand, Expression) or not result:
                 new_operand = eval_operand
+                unchanged = unchanged and eval_operand is operand
             else:
                 new_operand = op_func(result.pop(), eval_operand, *args, **kwargs)
+                unchanged = False
             result.append(new_operand)
             last_operand = operand
 
+        if unchanged and len(result) > 1:
+            return expr
+
         return result[0] if len(result) == 1 else expr_type(tuple(result))
 
     def map_call(self, expr, *args, **kwargs):
@@ -132,8 +606,12 @@ class StepSimplifier(RecursiveMapper):
         func, params = expr.__getinitargs__()
         eval_params = tuple(self.rec(p, *args, **kwargs) for p in params)
 
-        return expr_type(func, eval_params) if any(isinstance(p, Expression) for p in params) \
-            else func(*eval_params)
+        if not any(isinstance(p, Expression) for p in params):
+            result = func(*eval_params)
+            # a call to a symbolic function only rebuilds the call expression
+            return expr if isinstance(result, expr_type) and equals(result, expr) else result
+
+        return expr if all(ep is p for ep, p in zip(eval_params, params)) else expr_type(func, eval_params)
 
     def map_sum(self, expr, *args, **kwargs):
         return self.eval_multichild_expr(expr, lambda a, b, *args, **kwargs: a + b, *args, **kwargs)
@@ -184,7 +662,23 @@ class StepSimplifier(RecursiveMapper):
         return expr
 
     def map_numpy_array(self, expr, *args, **kwargs):
-        return np.vectorize(self.rec)(expr, *args, **kwargs)
+        if expr.dtype != object:
+            # numeric entries are already simplified
+            return expr
+
+        symbolic = [i for i, el in enumerate(expr.flat) if not isinstance(el, numbers.Number)]
+        if not symbolic:
+            return expr
+
+        result = expr.copy()
+        flat = result.reshape(-1)
+        for i in symbolic:
+            flat[i] = self.rec(flat[i], *args, **kwargs)
+
+        if all(isinstance(flat[i], numbers.Number) for i in symbolic):
+            # fully simplified entries are stored in the dtype numpy infers for them
+            return np.array(result.tolist())
+        return result
 
     def map_foreign(self, expr, *args, **kwargs):
         try:
@@ -198,12 +692,15 @@ class StepSimplifier(RecursiveMapper):
         Equivalent to calling this instance directly.
         """
 
-        return self.rec(expr, *args, **kwargs)
+        return self(expr, *args, **kwargs)
 
     def final_step(self, expr, *args, **kwargs):
         """Returns the most simplified step in the simplification of `expr`."""
 
-        return list(self.all_steps(expr, *args, **kwargs))[-1]
+        step = None
+        for step in self.all_steps(expr, *args, **kwargs):
+            pass
+        return step
 
     def all_steps(self, expr, *args, **kwargs):
         """
@@ -211,6 +708,8 @@ class StepSimplifier(RecursiveMapper):
         `expr` all the way to the most simplified step.
         """
 
+        self._normalized = {}
+
         while True:
             yield expr
             curr = self.next_step(expr, *args, **kwargs)
@@ -218,6 +717,110 @@ class StepSimplifier(RecursiveMapper):
                 break
             expr = curr
 
+    def trace_steps(self, expr, *args, **kwargs):
+        """Returns the `StepTrace` of the steps in the simplification of `expr`."""
+
+        return StepTrace(self.all_steps(expr, *args, **kwargs))
+
+    def astream_steps(self, expr, *args, executor=None, timeout=None, stringify=True, **kwargs):
+        """
+        Asynchronously yields the steps of `StepSimplifier.all_steps`. Each step is
+        simplified, and stringified, by the executor while the event loop stays free,
+        so the first step is yielded as soon as it is produced, however many steps follow.
+
+        The steps are simplified by a copy of this simplifier, so that several
+        walkthroughs may be streamed at once. Cancelling the consuming task or closing
+        the iterator stops the walkthrough, although a step already running in a
+        thread is only discarded once it is done.
+
+        :param executor: the `concurrent.futures.Executor` simplifying each step, or
+        `None` for the default executor of the running event loop
+
+        :param timeout: the maximum number of seconds a step may take, or `None`
+
+        :param stringify: whether to yield the strings of the steps by a
+        `matstep.stringifiers.StepStringifier` instead of the steps
+
+        :raise asyncio.TimeoutError: if a step takes longer than timeout
+        """
+
+        return self._astream(expr, False, executor, timeout, stringify, args, kwargs)
+
+    async def _astream(self, state, gaussian, executor, timeout, stringify, args, kwargs):
+        """Yields the steps of `astream_steps` or `MatrixSimplifier.astream_gaussian_steps`."""
+
+        loop = asyncio.get_running_loop()
+        simplifier = copy.copy(self)
+        simplifier.executor = self.executor
+
+        async def run(func, *func_args):
+            return await asyncio.wait_for(loop.run_in_executor(executor, func, *func_args), timeout)
+
+        step = state[0] if gaussian else state
+        yield await run(_step_string, step) if stringify else step
+
+        exact = gaussian and self.exact
+        while True:
+            curr, text = await run(_next_stream_step, simplifier, state, gaussian, exact, stringify, args, kwargs)
+            if equals(curr, state):
+                return
+
+            exact = exact and not isinstance(step, (np.ndarray, CowMatrix))
+            prev_step, state = step, curr
+            step = state[0] if gaussian else state
+            if not equals(step, prev_step):
+                # the pivot position of a gaussian step may move without changing the matrix
+                yield text if stringify else step
+
+
+def _count_nodes(expr, limit):
+    """Returns the number of nodes and object matrix entries of `expr`, counting no further than `limit`."""
+
+    count = 0
+    stack = [expr]
+    while stack and count < limit:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, Expression):
+            stack.extend(node.__getinitargs__())
+        elif isinstance(node, (tuple, list)):
+            stack.extend(node)
+        elif isinstance(node, np.ndarray) and node.dtype == object:
+            stack.extend(node.flat)
+    return count
+
+
+def _step_string(step):
+    """Returns the string of `step` by a `StepStringifier`."""
+
+    return StepStringifier()(step)
+
+
+def _next_stream_step(simplifier, state, gaussian, exact, stringify, args, kwargs):
+    """
+    Returns the state following `state` in a stream of steps of `simplifier`, which is
+    a step or a tuple of a step and its pivot position if gaussian, and the string of
+    its step if stringify. The matrix of a gaussian step is converted to fractions if exact.
+    """
+
+    if gaussian:
+        state = simplifier._next_gaussian_step(*state, exact, args, kwargs)
+    else:
+        state = simplifier.next_step(state, *args, **kwargs)
+    return state, _step_string(state[0] if gaussian else state) if stringify else None
+
+
+def _simplify_batch(simplifier, batch, args, kwargs):
+    """Returns the step or the error of each node of the batch simplified by `simplifier`."""
+
+    results = []
+    for node in batch:
+        try:
+            results.append((simplifier(node, *args, **kwargs), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
 
 class MatrixSimplifier(StepSimplifier):
     """
@@ -232,9 +835,22 @@ class MatrixSimplifier(StepSimplifier):
     ...               [1, 1]])
     >>> B = np.array([[1, 0],
     ...               [0, 1]])
-    >>> MatrixSimplifier()(Sum((A, B)))
-    array([[Sum((1, 1)), Sum((2, 0))],
-           [Sum((1, 0)), Sum((1, 1))]])
+    >>> step = MatrixSimplifier()(Sum((A, B)))
+    >>> print(step)
+    [[1 + 1, 2 + 0], [1 + 0, 1 + 1]]
+    >>> MatrixSimplifier()(step)
+    array([[2, 2],
+           [1, 2]])
+
+    Operations on numeric matrices, i.e. those whose dtype is not `object`, are
+    computed with whole-array NumPy calls. Their steps are instances of
+    `matstep.matrices.LazySum` and the like, whose matrix of expressions for each
+    element is only built by `entries` when the step is displayed.
+
+    A square matrix to a non-negative integer power is computed by repeated
+    squaring, so that A^k takes O(log k) matrix products. Numeric matrices to
+    any other power are diagonalized into P D^k P^-1 instead. Fractional powers of
+    negative eigenvalues are complex, and singular matrices have no negative powers.
 
     A `matstep.simplifiers.StepSimplifier` may suffice if expression steps
     inside matrices are not desirable. The above example would instead directly
@@ -242,6 +858,39 @@ class MatrixSimplifier(StepSimplifier):
     elements of `A` and `B` since `numpy.ndarray` overloads `__add__`.
     """
 
+    power_methods = ('auto', 'squaring', 'diagonalize')
+
+    def __init__(self, incremental=False, cache_size=None, power_method='auto', exact=False, pivoting='first',
+                 executor=None, parallel_threshold=1000):
+        """
+        :param power_method: one of `MatrixSimplifier.power_methods`; `'squaring'` for
+        repeated squaring, `'diagonalize'` for the diagonalization of numeric matrices,
+        or `'auto'` for repeated squaring if the exponent is a non-negative integer and
+        diagonalization otherwise
+
+        :param exact: whether the gaussian elimination of a matrix works on its entries
+        converted to `fractions.Fraction` instances, so that `RowMul` steps never turn
+        integer entries into floats whose rounding errors mislead the pivot search
+
+        :param pivoting: the `matstep.matrices.PivotStrategy` of the gaussian elimination or
+        one of the keys of `matstep.matrices.pivot_strategies`; `'first'` for the first
+        entry equal to 1 else the first nonzero entry of the pivot column, `'partial'` for
+        its entry of largest absolute value, or `'full'` for the entry of largest absolute
+        value of the lower right submatrix, moved with `matstep.matrices.ColumnSwap` steps
+
+        :raise ValueError: if power_method is not one of `MatrixSimplifier.power_methods`
+        or pivoting is not a known pivot strategy
+        """
+
+        if power_method not in self.power_methods:
+            raise ValueError('unknown power method %r, expected one of %s'
+                             % (power_method, ', '.join(self.power_methods)))
+
+        super(MatrixSimplifier, self).__init__(incremental, cache_size, executor, parallel_threshold)
+        self.power_method = power_method
+        self.exact = exact
+        self.pivoting = pivot_strategy(pivoting)
+
     def map_sum(self, expr, *args, **kwargs):
         def mat_add(op1, op2):
             if not isinstance(op1, np.ndarray) or not isinstance(op2, np.ndarray):
@@ -250,8 +899,12 @@ class MatrixSimplifier(StepSimplifier):
             if op1.shape != op2.shape:
                 raise ValueError('mismatched dimensions %s and %s' % (str(op1.shape), str(op2.shape)))
 
-            return np.array([[Sum((el1, el2)) for el1, el2 in zip(row1, row2)]
-                             for row1, row2 in zip(op1, op2)])
+            return np.frompyfunc(lambda el1, el2: Sum((el1, el2)), 2, 1)(op1, op2)
+
+        children = expr.children
+        if len(children) > 1 and all(is_numeric(c) and c.shape == children[0].shape for c in children):
+            # numeric matrices are added in one step without building the entries
+            return LazySum(children)
 
         try:
             result = self.eval_multichild_expr(expr, mat_add, *args, **kwargs)
@@ -262,29 +915,69 @@ class MatrixSimplifier(StepSimplifier):
 
     def map_product(self, expr, *args, **kwargs):
         def mat_mul(op1, op2):
+            if isinstance(op1, Expression) or isinstance(op2, Expression):
+                # e.g. a lazy step of a matrix, which numpy would broadcast into
+                return Product((op1, op2))
             if not isinstance(op1, np.ndarray) or not isinstance(op2, np.ndarray):
                 return op1 * op2
 
-            if op1.shape[1] != op2.shape[0]:
-                # mat1 cols must equal mat2 rows
-                raise ValueError('mismatched dimensions %s and %s' % (str(op1.shape), str(op2.shape)))
+            if is_numeric(op1) and is_numeric(op2):
+                if op1.shape[1] != op2.shape[0]:
+                    # mat1 cols must equal mat2 rows
+                    raise ValueError('mismatched dimensions %s and %s' % (str(op1.shape), str(op2.shape)))
+                return LazyMatrixProduct(op1, op2)
 
-            return np.array([[Product((el1, el2)) for el1, el2 in zip(row1, row2)]
-                             for row1, row2 in zip(op1.transpose(), op2)])
+            return matrix_product_entries(op1, op2)
 
         return self.eval_multichild_expr(expr, mat_mul, *args, **kwargs)
 
     def map_power(self, expr, *args, **kwargs):
         def mat_pow(base, exp):
-            if not isinstance(base, np.ndarray) or exp < -1:
+            if not isinstance(base, np.ndarray):
                 return base ** exp
 
             rows, cols = base.shape
+            if rows != cols:
+                raise ValueError('non-square matrix')
+
+            negative = isinstance(exp, numbers.Real) and exp < 0
+            if negative and is_numeric(base) and np.linalg.matrix_rank(base) < rows:
+                raise ValueError('singular matrix can not be raised to the power of %s' % str(exp))
+
             triu = base[np.triu_indices(rows, k=1)]
             tril = base[np.tril_indices(rows, k=-1)]
-
-            return np.diag([Power(el, exp) for el in base.diagonal()]) if not np.any(triu) and not np.any(tril) \
-                else np.array([[Power(el, exp) for el in row] for row in base])
+            if not np.any(triu) and not np.any(tril):
+                # diagonal matrix -> diagonal entries to the power
+                if is_numeric(base):
+                    if base.dtype.kind != 'c' and not isinstance(exp, numbers.Integral) \
+                            and np.any(base.diagonal() < 0):
+                        # fractional powers of negative numbers are complex
+                        base = base.astype(np.complex128)
+                    elif base.dtype.kind in 'biu' and negative:
+                        # numpy refuses integers to negative integer powers
+                        base = base.astype(np.float64)
+                    return LazyDiagonalPower(base, exp)
+                return np.diag([Power(el, exp) for el in base.diagonal()])
+
+            if self.power_method == 'diagonalize' \
+                    or self.power_method == 'auto' and not (isinstance(exp, numbers.Integral) and exp >= 0):
+                if not is_numeric(base):
+                    raise ValueError('only numeric matrices can be raised to the power of %s' % str(exp))
+                # A^k -> P D^k P^-1
+                p, d, p_inv = diagonalize(base)
+                return Product((p, Power(d, exp), p_inv))
+
+            if not isinstance(exp, numbers.Integral) or exp < 0:
+                raise ValueError('expected a non-negative integer exponent, got %s instead' % str(exp))
+            if exp == 0:
+                return np.eye(rows, dtype=base.dtype)
+            if exp == 1:
+                return base
+
+            # repeated squaring: A^2k -> (A A)^k and A^(2k + 1) -> (A A)^k A
+            square = Product((base, base))
+            half = square if exp // 2 == 1 else Power(square, exp // 2)
+            return half if exp % 2 == 0 else Product((half, base))
 
         return self.eval_binary_expr(expr, mat_pow, *args, **kwargs)
 
@@ -313,26 +1006,29 @@ class MatrixSimplifier(StepSimplifier):
 
         return self.eval_binary_expr(expr, vec_cross, *args, **kwargs)
 
-    def _eval_row_op(self, expr, op_func, *args, **kwargs):
+    def map_matstep_lazy_matrix(self, expr, *args, **kwargs):
+        return expr.value()
+
+    def _eval_row_op(self, expr, *args, **kwargs):
         expr_type = type(expr)
         ops = expr.__getinitargs__()[:-1]
         og_mat = expr.__getinitargs__()[-1]
         eval_mat = self.rec(og_mat)
 
-        if not isinstance(eval_mat, np.ndarray) or not equals(og_mat, eval_mat):
-            return expr_type(*ops, eval_mat, *args, **kwargs)
+        if isinstance(eval_mat, np.ndarray) and equals(og_mat, eval_mat) or isinstance(eval_mat, CowMatrix):
+            # numeric matrices are their own simplification, so the operation is applied to
+            # a copy, or to the rows shared by a copy-on-write matrix
+            return expr_type(*ops, eval_mat).apply()
 
-        op_func(*ops, eval_mat)
-        return eval_mat
+        return expr_type(*ops, eval_mat, *args, **kwargs)
 
-    def map_matstep_row_swap(self, expr, *args, **kwargs):
-        return self._eval_row_op(expr, lambda i, j, mat: op.setitem(mat, [i, j], mat[[j, i]]), *args, **kwargs)
+    map_matstep_row_swap = _eval_row_op
 
-    def map_matstep_row_mul(self, expr, *args, **kwargs):
-        return self._eval_row_op(expr, lambda i, k, mat: op.setitem(mat, i, k * mat[i]), *args, **kwargs)
+    map_matstep_row_mul = _eval_row_op
 
-    def map_matstep_row_add(self, expr, *args, **kwargs):
-        return self._eval_row_op(expr, lambda i, k, j, mat: op.setitem(mat, i, mat[i] + k * mat[j]), *args, **kwargs)
+    map_matstep_row_add = _eval_row_op
+
+    map_matstep_column_swap = _eval_row_op
 
     def next_gaussian_step(self, expr, h=0, k=0, *args, **kwargs):
         """
@@ -360,44 +1056,37 @@ class MatrixSimplifier(StepSimplifier):
         in the gaussian elimination.
         """
 
-        if not isinstance(expr, np.ndarray) or h >= expr.shape[0] or k >= expr.shape[1]:
-            return self.rec(expr, *args, **kwargs), h, k
-
-        k_col = expr[:, [k]]
-        sub_col = k_col[k:]
-        nonzero_sub_col = sub_col[sub_col != 0]
+        return self._next_gaussian_step(expr, h, k, self.exact, args, kwargs)
 
-        if nonzero_sub_col.size == 0:
-            # lower row elements in k-th col are zero -> pass to the next column
-            return self.rec(expr, *args, **kwargs), h, k + 1
+    def _next_gaussian_step(self, expr, h, k, exact, args, kwargs):
+        """
+        Returns the step of `MatrixSimplifier.next_gaussian_step`, converting the entries
+        of `expr` to fractions first if exact. The matrices following a converted one in
+        the elimination are left as they are since row operations on fractions make fractions.
+        """
 
-        # find element in k-th column for rows > k closest to 1
-        arr_i_one = np.where(sub_col == 1)[0]
-        i_min = (np.nonzero(sub_col)[0][0] if arr_i_one.size == 0 else arr_i_one[0]) + k
+        if not isinstance(expr, (np.ndarray, CowMatrix)) or h >= expr.shape[0] or k >= expr.shape[1]:
+            return self.next_step(expr, *args, **kwargs), h, k
 
-        if i_min != h:
-            # pivot not at expected row -> swap rows
-            return RowSwap(h, i_min, self.rec(expr, *args, *kwargs)), h, k
+        if exact:
+            fractions = to_fractions(np.asarray(expr))
+            expr = CowMatrix(fractions) if isinstance(expr, CowMatrix) else fractions
 
-        pivot = expr[h][k]
-        if pivot != 1:
-            # multiply row so pivot == 1
-            return RowMul(h, 1/pivot, expr), h, k
+        op_type, op_args = next_row_op(expr, h, k, self.pivoting)
+        if op_type is None:
+            return (self.next_step(expr, *args, **kwargs), *op_args)
+        if op_type in (RowSwap, ColumnSwap):
+            return op_type(*op_args, self.next_step(expr, *args, **kwargs)), h, k
 
-        nonzero_indices = np.nonzero(k_col.flatten())[0]
-        nonzero_indices = nonzero_indices[nonzero_indices != h]
-        if len(nonzero_indices) > 0:
-            # other values in pivot column are not zero -> make them zero one-by-one
-            i_nonzero = nonzero_indices[0]
-            return RowAdd(i_nonzero, -expr[i_nonzero][k], h, expr), h, k
-
-        # pivot column verified -> pass to the next row and column
-        return self.rec(expr, *args, **kwargs), h + 1, k + 1
+        return op_type(*op_args, expr), h, k
 
     def final_gaussian_step(self, expr, h=0, k=0, *args, **kwargs):
         """Returns the reduced row echelon form of `expr` if possible."""
 
-        return [*self.all_gaussian_steps(expr, h, k, *args, **kwargs)][-1]
+        step = None
+        for step in self.all_gaussian_steps(expr, h, k, *args, **kwargs):
+            pass
+        return step
 
     def all_gaussian_steps(self, expr, h=0, k=0, *args, **kwargs):
         """
@@ -405,9 +1094,160 @@ class MatrixSimplifier(StepSimplifier):
         from `expr` all the way to the reduced row echelon form of `expr`.
         """
 
+        exact = self.exact
         while True:
             yield expr, h, k
-            curr = self.next_gaussian_step(expr, h, k, *args, **kwargs)
+            curr = self._next_gaussian_step(expr, h, k, exact, args, kwargs)
             if equals(curr, (expr, h, k)):
                 break
+            # the first matrix is converted to fractions at most once
+            exact = exact and not isinstance(expr, (np.ndarray, CowMatrix))
             expr, h, k = curr
+
+    def trace_gaussian_steps(self, expr, h=0, k=0, *args, **kwargs):
+        """
+        Returns the `StepTrace` of the steps in the gaussian elimination of `expr`, each
+        of which is a tuple like those of `MatrixSimplifier.all_gaussian_steps`.
+        """
+
+        return StepTrace(self.all_gaussian_steps(expr, h, k, *args, **kwargs))
+
+    def astream_gaussian_steps(self, expr, h=0, k=0, *args, executor=None, timeout=None, stringify=True, **kwargs):
+        """
+        Asynchronously yields the steps of `MatrixSimplifier.all_gaussian_steps` like
+        `StepSimplifier.astream_steps`, without the pivot positions and without
+        repeating a matrix whose pivot position alone moved.
+        """
+
+        return self._astream((expr, h, k), True, executor, timeout, stringify, args, kwargs)
+
+    def batch_gaussian_steps(self, matrices):
+        """
+        Returns the steps in the gaussian elimination of each of the given numeric
+        matrices, which follow the same elementary row operations as
+        `MatrixSimplifier.all_gaussian_steps`. The pivot search and the row
+        operations run on all the matrices of the same shape at once.
+
+        :param matrices: a `numpy.ndarray` stack of matrices of shape (N, m, n) or an
+        iterable of numeric `numpy.ndarray` matrices of any shapes
+
+        :return: a list holding for each matrix the list of its steps, which starts
+        with the matrix and alternates between the `RowSwap`, `RowMul` or `RowAdd`
+        applied to the previous step and the resulting matrix, ending with the reduced
+        row echelon form of the matrix. Integer matrices are reduced as floats. Pivot
+        strategies other than `FirstNonzeroPivot` and `PartialPivot` reduce one matrix
+        at a time with a `matstep.matrices.RowReducer`.
+
+        :raise TypeError: if a matrix is not numeric
+        """
+
+        if type(self.pivoting) not in (FirstNonzeroPivot, PartialPivot):
+            return [_reducer_steps(mat, self.pivoting) for mat in matrices]
+
+        partial = type(self.pivoting) is PartialPivot
+        if isinstance(matrices, np.ndarray) and matrices.ndim == 3:
+            return _batch_gaussian_steps(matrices, partial)
+
+        matrices = [*matrices]
+        groups = {}
+        for i, mat in enumerate(matrices):
+            groups.setdefault(mat.shape, []).append(i)
+
+        steps = [None] * len(matrices)
+        for indices in groups.values():
+            for i, mat_steps in zip(indices, _batch_gaussian_steps(np.stack([matrices[i] for i in indices]), partial)):
+                steps[i] = mat_steps
+        return steps
+
+
+def _batch_gaussian_steps(stack, partial=False):
+    """
+    Returns the steps of `MatrixSimplifier.batch_gaussian_steps` for a stack of matrices
+    of the same shape, with partial pivoting if partial.
+    """
+
+    if not is_numeric(stack):
+        raise TypeError('expected numeric matrices, got %s instead' % str(stack.dtype))
+
+    stack = stack.astype(np.result_type(stack.dtype, float))
+    count, rows, cols = stack.shape
+    row_indices = np.arange(rows)
+    h = np.zeros(count, dtype=int)
+    k = np.zeros(count, dtype=int)
+    steps = [[mat] for mat in stack.copy()]
+
+    while True:
+        active = np.nonzero((h < rows) & (k < cols))[0]
+        if active.size == 0:
+            return steps
+
+        k_cols = stack[active, :, k[active]]
+        lower = row_indices >= h[active, None]
+        nonzero = k_cols != 0
+
+        # lower row elements in k-th col are zero -> pass to the next column
+        has_pivot = (nonzero & lower).any(axis=1)
+        k[active[~has_pivot]] += 1
+        active, k_cols, lower, nonzero = active[has_pivot], k_cols[has_pivot], lower[has_pivot], nonzero[has_pivot]
+        hs = h[active]
+        at = np.arange(active.size)
+
+        pivots = k_cols[at, hs]
+        if partial:
+            # find element in k-th column for rows >= h of largest absolute value unless the pivot is 1
+            i_min = np.where(pivots == 1, hs, np.where(lower, abs(k_cols), -1).argmax(axis=1))
+        else:
+            # find element in k-th column for rows >= h closest to 1
+            ones = (k_cols == 1) & lower
+            i_min = np.where(ones.any(axis=1), ones.argmax(axis=1), (nonzero & lower).argmax(axis=1))
+        others = nonzero & (row_indices != hs[:, None])
+
+        swap = i_min != hs
+        mul = ~swap & (pivots != 1)
+        add = ~swap & ~mul & others.any(axis=1)
+
+        # pivot column verified -> pass to the next row and column
+        verified = active[~swap & ~mul & ~add]
+        h[verified] += 1
+        k[verified] += 1
+
+        b, i, j = active[swap], hs[swap], i_min[swap]
+        stack[b, i], stack[b, j] = stack[b, j], stack[b, i]
+        ops = [RowSwap(i1, i2, steps[m][-1]) for m, i1, i2 in zip(b, i.tolist(), j.tolist())]
+        _append_row_ops(steps, stack, b, ops)
+
+        b, i, factors = active[mul], hs[mul], 1 / pivots[mul]
+        stack[b, i] = factors[:, None] * stack[b, i]
+        ops = [RowMul(i1, factor, steps[m][-1]) for m, i1, factor in zip(b, i.tolist(), factors)]
+        _append_row_ops(steps, stack, b, ops)
+
+        b, j = active[add], hs[add]
+        i = others[add].argmax(axis=1)
+        factors = -k_cols[add, i]
+        stack[b, i] = stack[b, i] + factors[:, None] * stack[b, j]
+        ops = [RowAdd(i1, factor, i2, steps[m][-1]) for m, i1, factor, i2 in zip(b, i.tolist(), factors, j.tolist())]
+        _append_row_ops(steps, stack, b, ops)
+
+
+def _reducer_steps(mat, pivoting):
+    """Returns the steps of `MatrixSimplifier.batch_gaussian_steps` for a single matrix reduced by a `RowReducer`."""
+
+    if not is_numeric(mat):
+        raise TypeError('expected numeric matrices, got %s instead' % str(mat.dtype))
+
+    reducer = RowReducer(mat, pivoting=pivoting)
+    steps = []
+    for row_op in reducer:
+        steps.append(reducer.matrix.copy())
+        steps.append(type(row_op)(*row_op.__getinitargs__()[:-1], steps[-1]))
+    steps.append(reducer.matrix.copy())
+    return steps
+
+
+def _append_row_ops(steps, stack, batch_indices, row_ops):
+    """Appends each row operation and the resulting matrix to the steps of its matrix in the batch."""
+
+    results = stack[batch_indices]
+    for m, row_op, result in zip(batch_indices, row_ops, results):
+        steps[m].append(row_op)
+        steps[m].append(result)
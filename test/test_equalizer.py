@@ -0,0 +1,97 @@
+import unittest
+from fractions import Fraction
+
+import numpy as np
+from pymbolic.primitives import Sum, Quotient, Call, Variable
+
+from matstep.equalizer import equals, fingerprint, same_types
+from matstep.matrices import Determinant, RowSwap
+
+
+class TestEquals(unittest.TestCase):
+    """Tests the equality of expression trees checked by `matstep.equalizer.equals`"""
+
+    def test_equals(self):
+        """Tests equal and unequal expression trees"""
+
+        # Test numerically equal constants of different types: 1 + 2 == 1.0 + 2
+        self.assertTrue(equals(Sum((1, 2)), Sum((1.0, 2))))
+
+        # Test operands of different lengths: 1 + 2 != 1 + 2 + 3
+        self.assertFalse(equals(Sum((1, 2)), Sum((1, 2, 3))))
+
+        # Test denominators: 1 / 2 != 1 / 3
+        self.assertFalse(equals(Quotient(1, 2), Quotient(1, 3)))
+
+        # Test variables: x + 1 != y + 1
+        self.assertFalse(equals(Sum((Variable('x'), 1)), Sum((Variable('y'), 1))))
+
+    def test_equals_numpy_array(self):
+        """Tests expression trees holding `numpy.ndarray` instances"""
+
+        array = np.array([[1, 2], [3, 4]])
+
+        # Test equal values of different dtypes
+        self.assertTrue(equals(array, array.astype(float)))
+        self.assertTrue(equals(array, array.astype(object)))
+
+        # Test matstep functions and row operations
+        self.assertTrue(equals(Call(Determinant(), (array, )), Call(Determinant(), (array.copy(), ))))
+        self.assertFalse(equals(RowSwap(0, 1, array), RowSwap(1, 0, array)))
+
+        # Test arrays are not equal to other sequences
+        self.assertFalse(equals(array, array.tolist()))
+
+    def test_equals_deep(self):
+        """Tests expression trees nested deeper than the recursion limit"""
+
+        expr1, expr2 = 0, 0
+        for i in range(10000):
+            expr1, expr2 = Sum((expr1, i)), Sum((expr2, i))
+
+        self.assertTrue(equals(expr1, expr2))
+        self.assertEqual(fingerprint(expr1), fingerprint(expr2))
+        self.assertFalse(equals(expr1, Sum((expr2, 1))))
+
+    def test_fingerprint(self):
+        """Tests the fingerprints of expression trees"""
+
+        # Test equal trees share fingerprints
+        self.assertEqual(fingerprint(Sum((1, 2))), fingerprint(Sum((1.0, 2))))
+        self.assertEqual(fingerprint(np.array([1, 2])), fingerprint(np.array([1.0, 2.0])))
+
+        # Test fingerprint is cached on nodes without arrays only
+        expr = Sum((1, Sum((2, 3))))
+        fingerprint(expr)
+        self.assertTrue(hasattr(expr, '_matstep_fingerprint'))
+        expr = Call(Determinant(), (np.array([[1]]), ))
+        fingerprint(expr)
+        self.assertFalse(hasattr(expr, '_matstep_fingerprint'))
+
+        # Test unhashable foreign objects -> None
+        self.assertIsNone(fingerprint(Sum((1, object()))))
+
+    def test_big_numbers(self):
+        """Tests arrays of numbers too large to fingerprint as complex numbers"""
+
+        for el in (10 ** 400, Fraction(10 ** 400, 3)):
+            array = np.array([[el, 1]], dtype=object)
+            self.assertIsNone(fingerprint(array))
+            self.assertTrue(equals(array, array.copy()))
+            self.assertFalse(equals(array, np.array([[el + 1, 1]], dtype=object)))
+
+    def test_same_types(self):
+        """Tests equal expressions are told apart by the types of their numbers"""
+
+        self.assertTrue(same_types(Sum((1, Sum((2, 3)))), Sum((1, Sum((2, 3))))))
+        self.assertFalse(same_types(Sum((1, Sum((2, 3)))), Sum((1, Sum((2.0, 3))))))
+        self.assertFalse(same_types(Quotient(Fraction(1), 3), Quotient(1.0, 3)))
+
+        # Test dtypes of numeric arrays and types of object array entries
+        self.assertFalse(same_types(np.array([1, 2]), np.array([1.0, 2.0])))
+        self.assertFalse(same_types(np.array([1, Fraction(2)]), np.array([1, 2.0], dtype=object)))
+        self.assertTrue(same_types(np.array([1, Fraction(2)]), np.array([1, Fraction(2)])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from matstep.logic import Proposition, LogicalEvaluator, LogicalCompiler, combination, combination_chunks
+
+
+class TestCombination(unittest.TestCase):
+    """Tests the assignment matrices built by `matstep.logic.combination`"""
+
+    def test_combination(self):
+        """Tests the rows of the matrix are the binary digits of the row indices"""
+
+        # Test 2 parameters: 00, 01, 10, 11
+        actual = combination(2)
+        expected = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+        self.assertTrue(np.array_equal(expected, actual))
+        self.assertEqual(np.uint8, actual.dtype)
+
+        # Test compact boolean dtype
+        self.assertEqual(bool, combination(3, dtype=bool).dtype)
+
+    def test_combination_chunks(self):
+        """Tests the blocks of rows stack up to the full matrix"""
+
+        # Test chunk size not dividing 2^n: blocks of 3, 3 and 2 rows
+        chunks = [*combination_chunks(3, chunk_size=3)]
+        self.assertEqual([3, 3, 2], [len(c) for c in chunks])
+        self.assertTrue(np.array_equal(combination(3), np.vstack(chunks)))
+
+        # Test invalid chunk size -> ValueError
+        self.assertRaises(ValueError, lambda: next(combination_chunks(3, chunk_size=0)))
+
+
+class TestLogicalCompiler(unittest.TestCase):
+    """Tests the functions generated by `matstep.logic.LogicalCompiler`"""
+
+    def test_compile(self):
+        """Tests compiled expressions against `matstep.logic.LogicalEvaluator`"""
+
+        p, q, r = Proposition('p'), Proposition('q'), Proposition('r')
+        expr = (p | ~(q & ~r)) >> (p & r)
+        evaluate = expr.compile()
+        evaluator = LogicalEvaluator()
+
+        # Test single truth values: 0 and 1 in, 0 and 1 out
+        for vals in combination(3).tolist():
+            evaluator.context = dict(zip(['p', 'q', 'r'], vals))
+            self.assertEqual(evaluator(expr), evaluate(evaluator.context))
+
+        # Test boolean columns: one column out
+        comb = combination(3, dtype=bool)
+        actual = evaluate({'p': comb[:, 0], 'q': comb[:, 1], 'r': comb[:, 2]})
+        self.assertTrue(np.array_equal(expr.tabulate().values[:, -1], actual))
+
+        # Test the function is cached on the expression
+        self.assertIs(evaluate, expr.compile())
+
+    def test_compile_many(self):
+        """Tests compiling several expressions into a single function"""
+
+        p, q = Proposition('p'), Proposition('q')
+        evaluate = LogicalCompiler()([p & q, p | q, ~(p & q)])
+        self.assertEqual((0, 1, 1), evaluate({'p': 1, 'q': 0}))
+
+        # Test shared subexpressions are computed once: p, q, p & q, p | q, ~(p & q)
+        self.assertEqual(5, evaluate.source.count(' = '))
+
+
+class TestTabulate(unittest.TestCase):
+    """Tests the truth tables built by `matstep.logic.LogicalExpression.tabulate`"""
+
+    def setUp(self) -> None:
+        """Initializes the propositions used to build the tested expressions"""
+
+        self.p, self.q, self.r = Proposition('p'), Proposition('q'), Proposition('r')
+
+    def assert_rowwise_equal(self, expr):
+        """Asserts the table of `expr` agrees with evaluating each row one at a time"""
+
+        table = expr.tabulate()
+        props = [c for c in table.columns if isinstance(c, Proposition)]
+        exprs = [c for c in table.columns if not isinstance(c, Proposition)]
+        evaluator = LogicalEvaluator()
+
+        for i, vals in enumerate(combination(len(props))):
+            evaluator.context = dict(zip([p.name for p in props], vals.tolist()))
+            expected = vals.tolist() + [evaluator(e) for e in exprs]
+            self.assertEqual(expected, table.iloc[i].tolist())
+
+    def test_columns(self):
+        """Tests the headers of the truth table"""
+
+        p, q, r = self.p, self.q, self.r
+        expr = p & q | r
+        actual = [*expr.tabulate().columns]
+        expected = [p, q, r, p & q, expr]
+        self.assertEqual(expected, actual)
+
+        # Test shared subexpressions are tabulated once: (p & q) | ~(p & q)
+        expr = (p & q) | ~(p & q)
+        actual = [*expr.tabulate().columns]
+        expected = [p, q, p & q, ~(p & q), expr]
+        self.assertEqual(expected, actual)
+
+    def test_values(self):
+        """Tests the vectorized truth table against row-by-row evaluation"""
+
+        p, q, r = self.p, self.q, self.r
+
+        # Test single proposition: p
+        self.assert_rowwise_equal(p)
+
+        # Test every operator: (p | ~(q & ~r)) -> (p & r)
+        self.assert_rowwise_equal((p | ~(q & ~r)) >> (p & r))
+
+        # Test nested implications: (p -> q) -> (q -> r)
+        self.assert_rowwise_equal((p >> q) >> (q >> r))
+
+    def test_tabulate_chunks(self):
+        """Tests the chunks of the truth table concatenate to the full table"""
+
+        p, q, r = self.p, self.q, self.r
+        expr = (p | ~(q & ~r)) >> (p & r)
+        chunks = [*expr.tabulate_chunks(chunk_size=3)]
+        self.assertEqual([3, 3, 2], [len(c) for c in chunks])
+        self.assertTrue(expr.tabulate().equals(pd.concat(chunks)))
+
+    def test_write_table(self):
+        """Tests the truth table written to disk chunk by chunk"""
+
+        p, q, r = self.p, self.q, self.r
+        expr = (p | ~(q & ~r)) >> (p & r)
+        table = expr.tabulate()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Test csv: headers are the string representations of the columns
+            path = os.path.join(tmp, 'table.csv')
+            expr.write_table(path, chunk_size=3)
+            actual = pd.read_csv(path)
+            self.assertEqual([str(c) for c in table.columns], [*actual.columns])
+            self.assertTrue(np.array_equal(table.values, actual.values))
+
+            # Test npy: memory-mapped values without headers
+            path = os.path.join(tmp, 'table.npy')
+            expr.write_table(path, chunk_size=3)
+            self.assertTrue(np.array_equal(table.values, np.load(path)))
+
+            # Test unsupported format -> ValueError
+            self.assertRaises(ValueError, lambda: expr.write_table(os.path.join(tmp, 'table.txt')))
+
+    def test_is_equivalent(self):
+        """Tests the equivalence of two expressions"""
+
+        p, q, r = self.p, self.q, self.r
+
+        for method in ('table', 'search'):
+            self.assertTrue((p >> q).is_equivalent(~p | q, method))
+            self.assertFalse((p >> q).is_equivalent(q >> p, method))
+
+            # Test expressions over different propositions: p | (q & ~q) and p & (r | ~r)
+            self.assertTrue((p | (q & ~q)).is_equivalent(p & (r | ~r), method))
+
+        table = (p >> q).tabulate()
+        self.assertTrue(np.issubdtype(table.values.dtype, np.integer))
+
+    def test_is_tautology(self):
+        """Tests whether an expression is true for every combination of its parameters"""
+
+        p, q = self.p, self.q
+
+        for method in ('table', 'search'):
+            self.assertTrue((p | ~p).is_tautology(method))
+            self.assertTrue((((p >> q) & p) >> q).is_tautology(method))
+            self.assertFalse((p >> q).is_tautology(method))
+
+    def test_find_model(self):
+        """Tests the search for a combination of parameters satisfying an expression"""
+
+        p, q, r = self.p, self.q, self.r
+        expr = (p | ~(q & ~r)) >> (p & r)
+
+        for method in ('table', 'search'):
+            # Test satisfiable: the model evaluates the expression to true
+            model = expr.find_model(method)
+            self.assertEqual({'p', 'q', 'r'}, set(model))
+            self.assertEqual(1, LogicalEvaluator(model)(expr))
+            self.assertTrue(expr.is_satisfiable(method))
+
+            # Test unsatisfiable: p & ~p -> None
+            self.assertIsNone((p & ~p & q).find_model(method))
+            self.assertFalse((p & ~p).is_satisfiable(method))
+
+        # Test invalid method -> ValueError
+        self.assertRaises(ValueError, lambda: expr.find_model('guess'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,14 @@
 import unittest
+from fractions import Fraction
 
 import numpy as np
+import sympy as sp
 from pymbolic.primitives import Call, Sum, Product
 
-from matstep.matrices import Determinant
-from matstep.simplifiers import StepSimplifier
+from matstep.equalizer import equals
+from matstep.matrices import Determinant, CondensedDeterminant, RowReducer, RowSwap, RowMul, RowAdd, ColumnSwap, \
+    CowMatrix
+from matstep.simplifiers import StepSimplifier, MatrixSimplifier
 
 
 class TestDeterminant(unittest.TestCase):
@@ -48,6 +52,219 @@ class TestDeterminant(unittest.TestCase):
                         Product((3, self.create_call_expr(np.array([[4, 5], [7, 8]]))))))
         self.assertEqual(expected, self.simplifier(self.create_call_expr(array)))
 
+    def test_sparse(self):
+        """Tests the cofactor expansion of matrices with zero entries"""
+
+        func = Determinant('cofactor')
+
+        # Test expansion along the column with the most zeros without zero terms
+        array = np.array([[1, 2, 0], [3, 4, 5], [6, 7, 0]])
+        expected = Product((-5, Call(func, (np.array([[1, 2], [6, 7]]), ))))
+        self.assertTrue(equals(expected, func(array)))
+
+        # Test block triangular matrix -> product of the determinants of the blocks
+        array = np.array([[1, 2, 0, 0], [3, 4, 0, 0], [5, 6, 7, 8], [9, 1, 2, 3]])
+        expected = Product((Call(func, (array[:2, :2], )), Call(func, (array[2:, 2:], ))))
+        self.assertTrue(equals(expected, func(array)))
+        self.assertEqual(-2 * 5, self.simplifier.final_step(Call(func, (array, ))))
+
+        # Test zero row -> 0
+        array = np.array([[1, 2, 3], [0, 0, 0], [4, 5, 7]])
+        self.assertEqual(0, func(array))
+
+    def test_shared_minors(self):
+        """Tests each distinct minor of a cofactor expansion is expanded once"""
+
+        func = Determinant('cofactor')
+        array = np.arange(1, 17).reshape(4, 4) ** 2
+
+        # Test minors removing rows {0, 1} and columns {0, 1} reached through
+        # minor(0, 0) then minor(0, 0), and minor(0, 1) then minor(0, 0)
+        minor00, minor01 = (term.children[1].parameters[0] for term in func(array).children[:2])
+        call00 = func(minor00).children[0].children[1]
+        call01 = func(minor01).children[0].children[1]
+        self.assertIs(call00, call01)
+        self.assertTrue(np.array_equal(array[2:, 2:], call00.parameters[0]))
+
+        # Test minors of a simplified copy are found by their entries
+        self.assertIs(call00, func(minor00.copy()).children[0].children[1])
+
+    def test_minors_reset(self):
+        """Tests the shared minors are dropped when a new matrix is expanded"""
+
+        func = Determinant('cofactor')
+        for i in range(20):
+            func(np.arange(i, i + 16).reshape(4, 4) ** 2)
+        size = len(func._minors), len(func._origins)
+
+        for i in range(20, 200):
+            func(np.arange(i, i + 16).reshape(4, 4) ** 2)
+        self.assertEqual(size, (len(func._minors), len(func._origins)))
+
+    def test_bareiss(self):
+        """Tests the determinant computed by fraction-free Gaussian elimination"""
+
+        func = Determinant('bareiss')
+
+        # Test first step: [[2, 1], [4, 3]] -> det([[2 * 3 + -4 * 1]], 2)
+        array = np.array([[2, 1], [4, 3]])
+        expected = Call(CondensedDeterminant(), (np.array([[Sum((Product((2, 3)), Product((-4, 1))))]]), 2))
+        self.assertTrue(equals(expected, func(array)))
+
+        # Test zero pivot -> rows swapped and sign flipped
+        array = np.array([[0, 2, 1], [1, 1, 1], [2, 0, 3]])
+        self.assertEqual(-4, self.simplifier.final_step(Call(func, (array, ))))
+
+        # Test integer entries stay exact past the range of 64-bit integers
+        array = np.array([[10 ** 6 * (i == j) + i + j for j in range(8)] for i in range(8)])
+        expected = sp.Matrix(array).det()
+        self.assertEqual(expected, self.simplifier.final_step(Call(func, (array, ))))
+
+        # Test singular matrix -> 0
+        array = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        self.assertEqual(0, self.simplifier.final_step(Call(func, (array, ))))
+
+    def test_strategy(self):
+        """Tests choosing the strategy of a determinant"""
+
+        array = np.arange(25).reshape(5, 5) % 7 + np.eye(5, dtype=int)
+        expected = round(np.linalg.det(array))
+        for strategy in Determinant.strategies:
+            self.assertEqual(expected, self.simplifier.final_step(Call(Determinant(strategy), (array, ))))
+
+        # Test auto: cofactor expansion for small matrices only
+        self.assertIsInstance(Determinant()(array[:3, :3]), Sum)
+        self.assertIsInstance(Determinant()(array), Call)
+
+        # Test unknown strategy -> ValueError
+        self.assertRaises(ValueError, lambda: Determinant('laplace'))
+
+
+class TestRowReducer(unittest.TestCase):
+    """Tests the row operations of a `matstep.matrices.RowReducer`"""
+
+    def test_row_ops(self):
+        """Tests the row operations against the steps of `matstep.simplifiers.MatrixSimplifier`"""
+
+        array = np.array([[0., 2., 1., 4.], [1., 1., 1., 1.], [2., 0., 3., 5.]])
+        steps = [step for step, _, _ in MatrixSimplifier().all_gaussian_steps(array)]
+        expected = [step for step in steps if isinstance(step, (RowSwap, RowMul, RowAdd))]
+
+        reducer = RowReducer(array)
+        actual = []
+        for row_op in reducer:
+            # the snapshot holds the matrix before the row operation
+            *op_args, mat = row_op.__getinitargs__()
+            self.assertTrue(equals(expected[len(actual)], type(row_op)(*op_args, np.asarray(mat))))
+            actual.append(row_op)
+
+        self.assertEqual(len(expected), len(actual))
+        self.assertTrue(np.allclose(steps[-1], reducer.matrix))
+        self.assertEqual((3, 3), (reducer.h, reducer.k))
+
+    def test_pivoting(self):
+        """Tests partial pivoting solves ill-conditioned systems more accurately in few more steps"""
+
+        def solve(A, pivoting):
+            b = A @ np.ones(len(A))
+            reducer = RowReducer(np.column_stack([A, b]), pivoting=pivoting)
+            steps = len([*reducer])
+            return abs(A @ reducer.matrix[:, -1] - b).max(), steps
+
+        # Test tiny pivot and Vandermonde matrices: A x = b with x = 1
+        for A in (np.array([[1e-17, 1.], [3., 1.]]), np.vander(np.linspace(1, 2, 8))):
+            first_residual, first_steps = solve(A, 'first')
+            partial_residual, partial_steps = solve(A, 'partial')
+            self.assertLess(partial_residual, 1e-12)
+            self.assertLess(partial_residual, first_residual)
+
+            # at most one more swap per pivot column
+            self.assertLessEqual(partial_steps, first_steps + len(A))
+
+    def test_records(self):
+        """Tests the records collected from a `matstep.matrices.RowReducer` keep their own matrices"""
+
+        # Test [[2, 4], [1, 3]] -> [[1, 3], [2, 4]] -> [[1, 3], [0, -2]] -> [[1, 3], [0, 1]] -> [[1, 0], [0, 1]]
+        records = [*RowReducer(np.array([[2., 4.], [1., 3.]]))]
+        expected = [[[2, 4], [1, 3]], [[1, 3], [2, 4]], [[1, 3], [0, -2]], [[1, 3], [0, 1]]]
+        self.assertEqual([RowSwap, RowAdd, RowMul, RowAdd], [type(row_op) for row_op in records])
+        self.assertEqual(expected, [np.asarray(row_op.mat).tolist() for row_op in records])
+
+        # Test replaying each record yields the matrix of the next one
+        for row_op, next_op in zip(records, records[1:]):
+            self.assertTrue(np.array_equal(np.asarray(next_op.mat), np.asarray(row_op.apply())))
+        self.assertTrue(np.array_equal(np.eye(2), np.asarray(records[-1].apply())))
+
+        # Test unchanged rows are shared by the snapshots
+        self.assertIs(records[1].mat.rows[0], records[2].mat.rows[0])
+
+    def test_fraction(self):
+        """Tests the reduction of a matrix of `fractions.Fraction` instances"""
+
+        array = np.array([[Fraction(3), Fraction(1)], [Fraction(1), Fraction(2)]], dtype=object)
+        expected = np.array([[1, 0], [0, 1]], dtype=object)
+        self.assertTrue(np.array_equal(expected, RowReducer(array).reduce()))
+
+        # Test the given matrix is not modified
+        self.assertEqual(Fraction(3), array[0][0])
+
+        # Test exact reduction of an integer matrix of rank 2
+        array = np.array([[-9, -11, -5], [-6, -2, -8], [-4, 4, -10]])
+        expected = np.array([[1, 0, Fraction(13, 8)], [0, 1, Fraction(-7, 8)], [0, 0, 0]])
+        self.assertTrue(np.array_equal(expected, RowReducer(array, exact=True).reduce()))
+
+        # Test invalid argument type -> TypeError
+        self.assertRaises(TypeError, lambda: RowReducer([[1, 2]]))
+
+
+class TestCowMatrix(unittest.TestCase):
+    """Tests the rows shared by the steps of a `matstep.matrices.CowMatrix`"""
+
+    def test_row_ops(self):
+        """Tests row operations only allocate the rows they change"""
+
+        array = np.array([[1., 2., 3.], [4., 5., 6.], [7., 8., 10.]])
+        A = CowMatrix(array)
+
+        # Test the given matrix is copied and the rows are read-only
+        array[0, 0] = 0
+        self.assertEqual(1, A[0, 0])
+        self.assertRaises(ValueError, lambda: A.rows[0].__setitem__(0, 0))
+
+        # Test RowAdd(2, -7, 0, A): only the third row is new
+        B = RowAdd(2, -7, 0, A).apply()
+        self.assertIs(A.rows[0], B.rows[0])
+        self.assertIs(A.rows[1], B.rows[1])
+        self.assertTrue(np.array_equal([0, -6, -11], B[2]))
+        self.assertTrue(np.array_equal([7, 8, 10], A[2]))
+
+        # Test RowSwap(0, 1, A) and RowMul(0, 2, A) against the same operations on arrays
+        for row_op in (RowSwap(0, 1, A), RowMul(0, 2, A), ColumnSwap(0, 2, A)):
+            expected = type(row_op)(*row_op.__getinitargs__()[:-1], np.asarray(A)).apply()
+            self.assertTrue(np.array_equal(expected, row_op.apply()))
+        self.assertIs(A.rows[0], RowSwap(0, 1, A).apply().rows[1])
+
+    def test_gaussian_steps(self):
+        """Tests the gaussian elimination of a `matstep.matrices.CowMatrix`"""
+
+        array = np.array([[0., 2., 1., 4.], [1., 1., 1., 1.], [2., 0., 3., 5.]])
+        expected = [step for step, _, _ in MatrixSimplifier().all_gaussian_steps(array)]
+        actual = [step for step, _, _ in MatrixSimplifier().all_gaussian_steps(CowMatrix(array))]
+        self.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            if isinstance(a, CowMatrix):
+                self.assertTrue(np.array_equal(e, a))
+            else:
+                self.assertEqual(type(e), type(a))
+                self.assertTrue(np.array_equal(e.mat, a.mat))
+
+        # Test the records of the reducer are distinct immutable steps
+        reducer = RowReducer(CowMatrix(array))
+        matrices = [row_op.mat for row_op in reducer]
+        self.assertTrue(np.array_equal(array, matrices[0]))
+        self.assertTrue(np.allclose(expected[-1], reducer.matrix))
+        self.assertEqual(len({id(mat) for mat in matrices}), len(matrices))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,37 @@
+import asyncio
+import pickle
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fractions import Fraction
 
-from pymbolic.primitives import Sum, Quotient, BitwiseNot, Call, Variable
+import numpy as np
+import sympy as sp
+from pymbolic.primitives import Sum, Product, Quotient, Power, BitwiseNot, Call, Variable
 
-from matstep.simplifiers import StepSimplifier
+from matstep.equalizer import equals
+from matstep.functions import Function, SquareRoot
+from matstep.logic import Proposition
+from matstep.matrices import Determinant, LazySum, LazyMatrixProduct, RowSwap, RowAdd, ColumnSwap, FullPivot
+from matstep.simplifiers import StepSimplifier, MatrixSimplifier, StepCache, StepTrace
+from matstep.stringifiers import StepStringifier
+
+
+class Sleep(Function):
+    """A function that sleeps for the given number of seconds and returns 0"""
+
+    name = 'sleep'
+    arg_count = 1
+
+    def __call__(self, seconds):
+        time.sleep(seconds)
+        return 0
+
+
+async def collect(steps):
+    """Returns the list of the steps yielded by an asynchronous iterator"""
+
+    return [step async for step in steps]
 
 
 class TestStepSimplifier(unittest.TestCase):
@@ -153,6 +182,472 @@ class TestStepSimplifier(unittest.TestCase):
         expected = Call(Variable('f'), (5, 5))
         self.assertEqual(expected, actual)
 
+    def test_incremental(self):
+        """
+        Tests the steps of an incremental `matstep.simplifiers.StepSimplifier`
+        against the steps of a non-incremental one.
+        """
+
+        frozen = Sum((Call(Variable('f'), (1, )), Call(Variable('g'), (2, ))))
+        expr = Sum((frozen, Sum((Sum((1, 2)), Sum((3, 4))))))
+        simplifier = StepSimplifier(incremental=True)
+
+        # Test same steps: [f(1) + g(2)] + [[1 + 2] + [3 + 4]] -> [f(1) + g(2)] + [3 + 7]
+        # -> [f(1) + g(2)] + 10
+        expected = [*self.simplifier.all_steps(expr)]
+        actual = [*simplifier.all_steps(expr)]
+        self.assertEqual(3, len(actual))
+        self.assertTrue(all(equals(e, a) for e, a in zip(expected, actual)))
+
+        # Test the subtree that can not be simplified is kept as is
+        self.assertIs(frozen, actual[-1].children[0])
+        self.assertIn(id(frozen), simplifier._normalized)
+
+    def test_deep_expression(self):
+        """Tests simplifying an expression nested deeper than the recursion limit"""
+
+        # Test (((1 + 1) + 2) + ...) + 9999 -> ((2 + 2) + ...) + 9999
+        expr, expected = Sum((1, 1)), 2
+        for i in range(2, 10000):
+            expr, expected = Sum((expr, i)), Sum((expected, i))
+        self.assertTrue(equals(expected, self.simplifier.next_step(expr)))
+
+    def test_unneeded_operands(self):
+        """Tests only the operands a step needs are simplified"""
+
+        calls = []
+        simplifier = StepSimplifier()
+        map_sum = simplifier.map_sum
+        simplifier.map_sum = lambda expr, *args, **kwargs: calls.append(expr) or map_sum(expr, *args, **kwargs)
+
+        # Test wide sum: every operand is simplified once, (0 + 1) + ... + (99 + 1) -> 1 + ... + 100
+        simplifier.next_step(Sum(tuple(Sum((i, 1)) for i in range(100))))
+        self.assertEqual(101, len(calls))
+
+        # Test operands of powers to zero are not simplified: (0 + 1)^0 + ... + (99 + 1)^0 -> 1 + ... + 1
+        calls.clear()
+        self.assertEqual(Sum((1, ) * 100), simplifier.next_step(Sum(tuple(Power(Sum((i, 1)), 0) for i in range(100)))))
+        self.assertEqual(1, len(calls))
+
+    def test_cache(self):
+        """Tests the steps cached by a `matstep.simplifiers.StepSimplifier`"""
+
+        simplifier = StepSimplifier(cache_size=2)
+
+        # Test repeated subexpression: [1 + 2] * [1 + 2] -> 3 * 3, second [1 + 2] is a hit
+        expr = Product((Sum((1, 2)), Sum((1, 2))))
+        self.assertEqual(Product((3, 3)), simplifier.next_step(expr))
+        self.assertEqual((1, 2, 0), (simplifier.cache.hits, simplifier.cache.misses, simplifier.cache.evictions))
+
+        # Test least recently used steps are evicted: only 6 + 7 and the new product are kept
+        simplifier.next_step(Product((Sum((4, 5)), Sum((6, 7)))))
+        self.assertEqual(2, len(simplifier.cache))
+        self.assertEqual(3, simplifier.cache.evictions)
+
+        # Test equal expressions holding numbers of other types are not hits:
+        # 1 + 2 -> 3 then 1.0 + 2 -> 3.0, and 1/3 -> Fraction(1, 3) then 1.0/3 -> 0.333...
+        simplifier = StepSimplifier(cache_size=100)
+        for expr in (Sum((1, 2)), Sum((1.0, 2)), Quotient(Fraction(1), 3), Quotient(1.0, 3)):
+            expected = StepSimplifier().next_step(expr)
+            actual = simplifier.next_step(expr)
+            self.assertEqual(expected, actual)
+            self.assertIs(type(expected), type(actual))
+
+    def test_map_numpy_array(self):
+        """Tests the dispatch of `numpy.ndarray` instances on their dtype"""
+
+        # Test numeric matrix -> the matrix itself
+        array = np.array([[1, 2], [3, 4]])
+        self.assertIs(array, self.simplifier(array))
+
+        # Test only symbolic entries are visited: [[1 + 2, 2], [3, 4]] -> [[3, 2], [3, 4]]
+        visited = []
+        simplifier = StepSimplifier()
+        simplifier.map_constant = lambda expr, *args, **kwargs: visited.append(expr) or expr
+        array = np.array([[Sum((1, 2)), 2], [3, 4]], dtype=object)
+        actual = simplifier(array)
+        self.assertEqual([1, 2], visited)
+        self.assertTrue(np.array_equal([[3, 2], [3, 4]], actual))
+        self.assertEqual(np.int64, actual.dtype)
+        self.assertIsInstance(array[0, 0], Sum)
+
+        # Test integers too large for int64: [[10 ** 400, 1 + 2]] -> [[10 ** 400, 3]]
+        actual = StepSimplifier().final_step(np.array([[10 ** 400, Sum((1, 2))]], dtype=object))
+        self.assertEqual([[10 ** 400, 3]], actual.tolist())
+
+        # Test symbolic entries left -> object matrix: [[x, 1 + 1]] -> [[x, 2]]
+        actual = self.simplifier(np.array([[sp.Symbol('x'), Sum((1, 1))]]))
+        self.assertEqual(object, actual.dtype)
+        self.assertEqual(2, actual[0, 1])
+
+    def test_trace_steps(self):
+        """Tests the steps rebuilt by a `matstep.simplifiers.StepTrace`"""
+
+        # Test (1 + 2) * (3 + 4) + 2 ** (1 + 1) -> 3 * 7 + 2 ** 2 -> 21 + 4 -> 25
+        expr = Sum((Product((Sum((1, 2)), Sum((3, 4)))), Power(2, Sum((1, 1)))))
+        expected = [*self.simplifier.all_steps(expr)]
+        trace = self.simplifier.trace_steps(expr)
+        self.assertEqual(len(expected), len(trace))
+        self.assertTrue(equals(expected, [*trace]))
+        self.assertTrue(equals(expected[1], trace[1]))
+        self.assertEqual(25, trace[-1])
+
+        # Test deltas are stored at the changed subtrees: 1 + 2 -> 3, 3 + 4 -> 7 and 1 + 1 -> 2
+        # through the children tuples of the sum and the product
+        self.assertEqual({(0, 0, 0, 0), (0, 0, 0, 1), (0, 1, 1)}, {path for path, _, _ in trace._deltas[0]})
+
+        # Test 1-D object array: [1 + 2, (1 + 1) + 1] -> [3, 2 + 1] -> [3, 3]
+        expr = np.array([Sum((1, 2)), Sum((Sum((1, 1)), 1))], dtype=object)
+        expected = [*self.simplifier.all_steps(expr)]
+        trace = self.simplifier.trace_steps(expr)
+        self.assertTrue(equals(expected, [*trace]))
+        self.assertTrue(np.array_equal([3, 3], trace[-1]))
+
+        # Test out of range index -> IndexError, no steps -> ValueError
+        self.assertRaises(IndexError, lambda: trace[len(expected)])
+        self.assertRaises(ValueError, lambda: StepTrace([]))
+
+    def test_astream_steps(self):
+        """Tests the steps streamed by `matstep.simplifiers.StepSimplifier.astream_steps`"""
+
+        # Test (1 + 2) * 3 + (4 + 5) -> 3 * 3 + 9 -> 9 + 9 -> 18
+        expr = Sum((Product((Sum((1, 2)), 3)), Sum((4, 5))))
+        steps = [*self.simplifier.all_steps(expr)]
+        self.assertEqual([StepStringifier()(step) for step in steps],
+                         asyncio.run(collect(self.simplifier.astream_steps(expr))))
+        self.assertTrue(equals(steps, asyncio.run(collect(self.simplifier.astream_steps(expr, stringify=False)))))
+
+        # Test slow step -> asyncio.TimeoutError after the first step
+        async def first_then_timeout():
+            stream = self.simplifier.astream_steps(Sum((Call(Sleep(), (0.5, )), 1)), timeout=0.05)
+            start = time.perf_counter()
+            self.assertEqual('sleep(0.5) + 1', await stream.__anext__())
+            self.assertLess(time.perf_counter() - start, 0.5)
+            with self.assertRaises(asyncio.TimeoutError):
+                await stream.__anext__()
+        asyncio.run(first_then_timeout())
+
+        # Test cancelling the consumer does not wait for the running step
+        async def cancel():
+            task = asyncio.ensure_future(collect(self.simplifier.astream_steps(Call(Sleep(), (0.5, )))))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertLess(time.perf_counter() - start, 0.5)
+        asyncio.run(cancel())
+
+    def test_step_cache(self):
+        """Tests the entries of a `matstep.simplifiers.StepCache`"""
+
+        cache = StepCache(maxsize=1)
+        array = np.array([[1, 2], [3, 4]])
+        cache.put(0, Sum((1, 2)), array)
+
+        # Test cached arrays are copies: mutating the returned step does not affect the cache
+        step = cache.get(0, Sum((1, 2)))
+        step[0, 0] = 5
+        self.assertTrue(np.array_equal(array, cache.get(0, Sum((1, 2)))))
+
+        # Test fingerprint collision with an unequal expression -> KeyError
+        self.assertRaises(KeyError, lambda: cache.get(0, Sum((2, 1))))
+        self.assertEqual(1, cache.misses)
+
+
+class TestMatrixSimplifier(unittest.TestCase):
+    """Tests the steps of expressions involving matrices simplified by `matstep.simplifiers.MatrixSimplifier`"""
+
+    def setUp(self) -> None:
+        """Initializes simplifier attribute to a `matstep.simplifiers.MatrixSimplifier` instance"""
+        self.simplifier = MatrixSimplifier()
+
+    def test_lazy_sum(self):
+        """Tests the sum of numeric matrices"""
+
+        A = np.array([[1, 2], [1, 1]])
+        B = np.array([[1, 0], [0, 1]])
+
+        # Test one step: [[1 + 1, 2 + 0], [1 + 0, 1 + 1]] -> [[2, 2], [1, 2]]
+        step = self.simplifier(Sum((A, B, A)))
+        self.assertIsInstance(step, LazySum)
+        expected = np.array([[Sum((1, 1, 1)), Sum((2, 0, 2))], [Sum((1, 0, 1)), Sum((1, 1, 1))]])
+        self.assertTrue(equals(expected, step.entries()))
+        self.assertTrue(np.array_equal(A + B + A, self.simplifier(step)))
+
+        # Test a cached integer sum is not reused for an equal float sum
+        simplifier = MatrixSimplifier(cache_size=100)
+        self.assertEqual(np.int_, simplifier.final_step(Sum((A, B))).dtype)
+        self.assertEqual(np.float64, simplifier.final_step(Sum((A.astype(float), B))).dtype)
+
+        # Test object matrices: entries built right away
+        step = self.simplifier(Sum((A.astype(object), B)))
+        self.assertTrue(equals(np.array([[Sum((1, 1)), Sum((2, 0))], [Sum((1, 0)), Sum((1, 1))]]), step))
+
+    def test_matrix_product(self):
+        """Tests the matrix product of two matrices"""
+
+        A = np.array([[1, 2], [3, 4]])
+        B = np.array([[5, 6], [7, 8]])
+
+        # Test one sum of products per entry: [[1*5 + 2*7, 1*6 + 2*8], [3*5 + 4*7, 3*6 + 4*8]]
+        expected = np.array([[Sum((Product((1, 5)), Product((2, 7)))), Sum((Product((1, 6)), Product((2, 8))))],
+                             [Sum((Product((3, 5)), Product((4, 7)))), Sum((Product((3, 6)), Product((4, 8))))]])
+        step = self.simplifier(Product((A, B)))
+        self.assertIsInstance(step, LazyMatrixProduct)
+        self.assertTrue(equals(expected, step.entries()))
+        self.assertTrue(np.array_equal(A @ B, self.simplifier.final_step(step)))
+
+        # Test symbolic matrices: entries built right away
+        x = sp.Symbol('x')
+        X = np.array([[x, 2], [3, 4]], dtype=object)
+        expected[0][0] = Sum((Product((x, 5)), Product((2, 7))))
+        expected[0][1] = Sum((Product((x, 6)), Product((2, 8))))
+        self.assertTrue(equals(expected, self.simplifier(Product((X, B)))))
+
+        # Test non-square matrices: (1 x 2) (2 x 3) -> (1 x 3)
+        C = np.array([[1, 2, 3], [4, 5, 6]])
+        self.assertTrue(np.array_equal(A[:1] @ C, self.simplifier.final_step(Product((A[:1], C)))))
+
+        # Test mismatched dimensions -> ValueError
+        self.assertRaises(ValueError, lambda: self.simplifier(Product((C, A))))
+
+    def test_matrix_power(self):
+        """Tests the power of a square matrix"""
+
+        A = np.array([[1, 1], [1, 0]])
+
+        # Test repeated squaring: A^5 -> (A A)^2 A
+        expected = Product((Power(Product((A, A)), 2), A))
+        self.assertTrue(equals(expected, self.simplifier(Power(A, 5))))
+        self.assertTrue(np.array_equal(np.linalg.matrix_power(A, 5), self.simplifier.final_step(Power(A, 5))))
+
+        # Test O(log k) steps: 1000 = 0b1111101000 -> 9 squarings and 5 other products
+        steps = [*self.simplifier.all_steps(Power(A.astype(float), 1000))]
+        self.assertLessEqual(len(steps), 3 * (9 + 5))
+
+        # Test zero exponent -> identity
+        self.assertTrue(np.array_equal(np.eye(2), self.simplifier(Power(A, 0))))
+
+        # Test negative exponent -> diagonalization: A^-1 -> P D^-1 P^-1
+        actual = self.simplifier.final_step(Power(A, -1))
+        self.assertTrue(np.allclose(np.linalg.inv(A), actual))
+        simplifier = MatrixSimplifier(power_method='diagonalize')
+        self.assertTrue(np.allclose(np.linalg.matrix_power(A, 5), simplifier.final_step(Power(A, 5))))
+
+        # Test fractional power of negative eigenvalues -> complex: [[0, 1], [1, 0]]^0.5
+        B = np.array([[0, 1], [1, 0]])
+        actual = self.simplifier.final_step(Power(B, 0.5))
+        self.assertFalse(np.any(np.isnan(actual)))
+        self.assertTrue(np.allclose(B, actual @ actual))
+
+        # Test negative power of diagonal integer matrix
+        actual = self.simplifier.final_step(Power(np.diag([2, 4]), -1))
+        self.assertTrue(np.array_equal(np.diag([0.5, 0.25]), actual))
+
+        # Test negative power of singular matrix -> ValueError
+        self.assertRaises(ValueError, lambda: self.simplifier(Power(np.array([[1, 2], [2, 4]]), -1)))
+        self.assertRaises(ValueError, lambda: self.simplifier(Power(np.diag([0, 3]), -1)))
+
+        # Test non-diagonalizable matrix -> ValueError
+        self.assertRaises(ValueError, lambda: self.simplifier(Power(np.array([[1, 1], [0, 1]]), 0.5)))
+
+        # Test non-square matrix -> ValueError
+        self.assertRaises(ValueError, lambda: self.simplifier(Power(np.array([[1, 2]]), 2)))
+
+        # Test unknown method -> ValueError
+        self.assertRaises(ValueError, lambda: MatrixSimplifier(power_method='guess'))
+
+    def test_gaussian_steps(self):
+        """Tests the steps of the gaussian elimination of a matrix"""
+
+        # Test pivot below a skipped column: [[0, 1, 2], [0, 0, 3]] -> [[0, 1, 0], [0, 0, 1]]
+        A = np.array([[0., 1., 2.], [0., 0., 3.]])
+        expected = np.array([[0, 1, 0], [0, 0, 1]])
+        actual, _, _ = self.simplifier.final_gaussian_step(A)
+        self.assertTrue(np.array_equal(expected, actual))
+
+    def test_exact_gaussian_steps(self):
+        """Tests the gaussian elimination of a matrix with exact fractions"""
+
+        # Test rank 2 matrix: rounding errors would leave a nonzero last row
+        A = np.array([[-9, -11, -5], [-6, -2, -8], [-4, 4, -10]])
+        expected = np.array([[1, 0, Fraction(13, 8)], [0, 1, Fraction(-7, 8)], [0, 0, 0]])
+        actual, _, _ = MatrixSimplifier(exact=True).final_gaussian_step(A)
+        self.assertTrue(np.array_equal(expected, actual))
+        self.assertTrue(all(isinstance(el, Fraction) for el in actual.flat))
+
+        # Test a cached float elimination is not reused by an exact one
+        simplifier = MatrixSimplifier(cache_size=100)
+        B = np.array([[2., 4.], [1., 3.]])
+        simplifier.final_gaussian_step(B)
+        simplifier.exact = True
+        actual, _, _ = simplifier.final_gaussian_step(B)
+        self.assertTrue(np.array_equal(np.eye(2), actual))
+        self.assertTrue(all(isinstance(el, Fraction) for el in actual.flat))
+
+        # Test the row operations hold fractions: RowMul(0, -1/9, A)
+        step, _, _ = MatrixSimplifier(exact=True).next_gaussian_step(A)
+        self.assertEqual(Fraction(-1, 9), step.k)
+
+        # Test a matrix reached by simplifying an expression is converted: A + 0 -> fractions
+        simplifier = MatrixSimplifier(exact=True)
+        actual, _, _ = simplifier.final_gaussian_step(Sum((A, np.zeros((3, 3), dtype=int))))
+        self.assertTrue(np.array_equal(expected, actual))
+        self.assertTrue(all(isinstance(el, Fraction) for el in actual.flat))
+
+        # Test the streamed steps hold fractions too
+        steps = asyncio.run(collect(simplifier.astream_gaussian_steps(A, stringify=False)))
+        self.assertTrue(np.array_equal(expected, steps[-1]))
+        self.assertTrue(all(isinstance(el, Fraction) for el in steps[-1].flat))
+
+    def test_row_op_copies(self):
+        """Tests evaluating a row operation leaves the matrices of earlier steps as they were"""
+
+        A = np.array([[1., 2.], [3., 4.]])
+        step = self.simplifier(RowSwap(0, 1, A))
+        self.assertTrue(np.array_equal([[3, 4], [1, 2]], step))
+        self.assertTrue(np.array_equal([[1, 2], [3, 4]], A))
+
+        steps = [step for step, _, _ in self.simplifier.all_gaussian_steps(A)]
+        self.assertTrue(np.array_equal([[1, 2], [3, 4]], steps[0]))
+
+    def test_parallel(self):
+        """Tests the steps simplified with an executor are the steps simplified without one"""
+
+        rng = np.random.default_rng(0)
+        det = Call(Determinant('cofactor'), (rng.integers(-5, 6, (5, 5)), ))
+        cells = np.array([[Sum((Product((i, j)), j)) for j in range(8)] for i in range(8)], dtype=object)
+        expected = [[*self.simplifier.all_steps(expr)] for expr in (det, cells)]
+
+        for executor in (ThreadPoolExecutor(2), ProcessPoolExecutor(2)):
+            with executor:
+                simplifier = MatrixSimplifier(executor=executor, parallel_threshold=20)
+                actual = [[*simplifier.all_steps(expr)] for expr in (det, cells)]
+            self.assertTrue(equals(expected, actual))
+
+        # Test errors raised in the executor are raised by the step: [1, 2] + [1, 2, 3]
+        with ThreadPoolExecutor(2) as executor:
+            simplifier = MatrixSimplifier(executor=executor, parallel_threshold=1)
+            expr = Product((Sum((np.array([1, 2]), np.array([1, 2, 3]))), 2))
+            self.assertRaises(ValueError, lambda: simplifier(expr))
+
+    def test_pickle(self):
+        """Tests expressions survive pickling for a process pool"""
+
+        A = np.array([[1, 2], [3, 4]])
+        p, q = Proposition('p'), Proposition('q')
+        exprs = [Call(Determinant('bareiss'), (A, )), RowAdd(0, 2, 1, A), ColumnSwap(0, 1, A),
+                 LazySum((A, A)), LazyMatrixProduct(A, A), Call(SquareRoot(), (4, )), p >> q]
+        for expr in exprs:
+            self.assertTrue(equals(expr, pickle.loads(pickle.dumps(expr))))
+
+        # Test the unpickled determinant has its own cache of minors
+        self.assertEqual({}, pickle.loads(pickle.dumps(Determinant()))._minors)
+
+    def test_pivoting(self):
+        """Tests the pivot strategies of the gaussian elimination of a matrix"""
+
+        # Test tiny first pivot: [[1e-17, 1, 1], [3, 1, 4]] -> x = y = 1
+        A = np.array([[1e-17, 1., 1.], [3., 1., 4.]])
+        actual, _, _ = self.simplifier.final_gaussian_step(A)
+        self.assertFalse(np.allclose([1, 1], actual[:, -1]))
+        actual, _, _ = MatrixSimplifier(pivoting='partial').final_gaussian_step(A)
+        self.assertTrue(np.allclose([1, 1], actual[:, -1]))
+
+        # Test partial pivoting swaps the largest entry into the pivot row: RowSwap(0, 1, A)
+        step, _, _ = MatrixSimplifier(pivoting='partial').next_gaussian_step(A)
+        self.assertTrue(equals(RowSwap(0, 1, A), step))
+
+        # Test full pivoting swaps the largest entry into the pivot column: ColumnSwap(0, 2, A)
+        A = np.array([[2., 1., 5.], [3., 1., 4.]])
+        simplifier = MatrixSimplifier(pivoting='full')
+        step, _, _ = simplifier.next_gaussian_step(A)
+        self.assertTrue(equals(ColumnSwap(0, 2, A), step))
+        self.assertTrue(np.array_equal(A[:, [2, 1, 0]], simplifier(step)))
+
+        # Test the reduced form is that of A with its columns permuted to [2, 0, 1]
+        actual, _, _ = simplifier.final_gaussian_step(A)
+        self.assertTrue(np.allclose([[1, 0, 1/7], [0, 1, 1/7]], actual))
+
+        # Test the column limit keeps the last column of an augmented matrix in place
+        actual, _, _ = MatrixSimplifier(pivoting=FullPivot(columns=2)).final_gaussian_step(A)
+        self.assertTrue(np.allclose([[1, 0, -1], [0, 1, 7]], actual))
+
+        # Test batch elimination follows the strategy
+        rng = np.random.default_rng(0)
+        matrices = [rng.integers(-3, 4, (3, 4)) * (rng.random((3, 4)) < 0.7) for _ in range(10)]
+        for pivoting in ('partial', 'full'):
+            simplifier = MatrixSimplifier(pivoting=pivoting)
+            for A, actual in zip(matrices, simplifier.batch_gaussian_steps(matrices)):
+                expected = []
+                for step, _, _ in simplifier.all_gaussian_steps(A.astype(float)):
+                    if not expected or not equals(expected[-1], step):
+                        expected.append(step)
+                self.assertTrue(equals(expected, actual))
+
+        # Test unknown strategy -> ValueError
+        self.assertRaises(ValueError, lambda: MatrixSimplifier(pivoting='guess'))
+
+    def test_trace_gaussian_steps(self):
+        """Tests the steps of the gaussian elimination rebuilt by a `matstep.simplifiers.StepTrace`"""
+
+        A = np.array([[0., 2., 1., 4.], [1., 1., 1., 1.], [2., 0., 3., 5.]])
+        for pivoting in ('full', 'first'):
+            simplifier = MatrixSimplifier(pivoting=pivoting)
+            expected = [*simplifier.all_gaussian_steps(A)]
+            trace = simplifier.trace_gaussian_steps(A)
+            self.assertTrue(equals(expected, [*trace]))
+            self.assertTrue(equals(simplifier.final_gaussian_step(A), trace[-1]))
+
+        # Test row operations are stored as records without their matrix: RowSwap(0, 1, A)
+        (path, _, (op_type, op_args)), = trace._deltas[0]
+        self.assertEqual(((0, ), RowSwap, (0, 1)), (path, op_type, op_args))
+
+    def test_astream_gaussian_steps(self):
+        """Tests the steps of the gaussian elimination streamed without repeated matrices"""
+
+        A = np.array([[0., 2., 1.], [1., 1., 1.]])
+        expected = []
+        for step, _, _ in self.simplifier.all_gaussian_steps(A):
+            if not expected or not equals(expected[-1], step):
+                expected.append(step)
+
+        actual = asyncio.run(collect(self.simplifier.astream_gaussian_steps(A, stringify=False)))
+        self.assertTrue(equals(expected, actual))
+        actual = asyncio.run(collect(self.simplifier.astream_gaussian_steps(A)))
+        self.assertEqual([StepStringifier()(step) for step in expected], actual)
+
+    def test_batch_gaussian_steps(self):
+        """Tests the gaussian elimination of many matrices at once against one at a time"""
+
+        rng = np.random.default_rng(0)
+        matrices = [rng.integers(-3, 4, (3, 4)) * (rng.random((3, 4)) < 0.7) for _ in range(20)]
+        matrices += [np.array([[2, 4], [1, 3]]), np.zeros((2, 3))]
+
+        for A, actual in zip(matrices, self.simplifier.batch_gaussian_steps(matrices)):
+            expected = []
+            for step, _, _ in self.simplifier.all_gaussian_steps(A.astype(float)):
+                if not expected or not equals(expected[-1], step):
+                    expected.append(step)
+            self.assertTrue(equals(expected, actual))
+
+        # Test stack of matrices: [[2, 4], [1, 3]] -> RowSwap(0, 1) -> ... -> identity
+        steps, = self.simplifier.batch_gaussian_steps(np.array([[[2, 4], [1, 3]]]))
+        self.assertIsInstance(steps[1], RowSwap)
+        self.assertTrue(np.array_equal(np.eye(2), steps[-1]))
+
+        # Test symbolic matrix -> TypeError
+        self.assertRaises(TypeError, lambda: self.simplifier.batch_gaussian_steps([np.array([[sp.Symbol('x')]])]))
+
+    def test_lazy_diagonal_power(self):
+        """Tests the power of a numeric diagonal matrix"""
+
+        # Test diag(2, 3) ** 3 -> diag(2 ** 3, 3 ** 3) -> diag(8, 27)
+        step = self.simplifier(Power(np.diag([2, 3]), 3))
+        self.assertTrue(equals(np.diag([Power(2, 3), Power(3, 3)]), step.entries()))
+        self.assertTrue(np.array_equal(np.diag([8, 27]), self.simplifier.final_step(step)))
+
 
 if __name__ == '__main__':
     unittest.main()